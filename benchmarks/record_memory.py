@@ -0,0 +1,57 @@
+"""Memory and validation time for per-record models vs. record batches.
+
+Usage:
+    python -m benchmarks.record_memory [n_records]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from src.utils.validators import ClinicalTrial, ClinicalTrialBatch
+
+
+def make_raw_trials(n):
+    start = datetime(2015, 1, 1)
+    return [
+        {
+            "trial_id": f"NCT{i:08d}",
+            "title": f"Study {i} of aspirin in cardiovascular disease",
+            "status": "RECRUITING" if i % 3 else "COMPLETED",
+            "participants": i % 500,
+            "start_date": start + timedelta(days=i % 3650),
+        }
+        for i in range(n)
+    ]
+
+
+def measure(label, build, raw):
+    # Time and memory are measured in separate runs; tracemalloc slows
+    # allocation-heavy code down. Strings shared with the raw input are
+    # not counted for either representation.
+    gc.collect()
+    began = time.perf_counter()
+    build(raw)
+    elapsed = time.perf_counter() - began
+
+    gc.collect()
+    tracemalloc.start()
+    result = build(raw)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} {elapsed:8.3f} s  {current / 1024 / 1024:8.1f} MiB")
+    return result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    raw = make_raw_trials(n)
+    print(f"{n} clinical trial records")
+    measure("pydantic models", lambda rows: [ClinicalTrial(**r) for r in rows], raw)
+    measure("ClinicalTrialBatch", ClinicalTrialBatch.validate, raw)
+
+
+if __name__ == "__main__":
+    main()
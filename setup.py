@@ -12,6 +12,7 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/manikantaoruganti/pharma-agentic-ai",
     packages=find_packages(),
+    package_data={"src": ["data/*.tsv"]},
     classifiers=[
         "Programming Language :: Python :: 3",
         "Programming Language :: Python :: 3.9",
@@ -9,15 +9,9 @@ __author__ = "Team P16"
 __email__ = "team"
 
 from src.agents.base_agent import BaseAgent
-from src.agents.drug_discovery_agent import DrugDiscoveryAgent
-from src.agents.literature_agent import LiteratureAgent
-from src.models.drug_model import DrugModel
-from src.services.llm_service import LLMService
+from src.models import DrugModel
 
 __all__ = [
     "BaseAgent",
-    "DrugDiscoveryAgent",
-    "LiteratureAgent",
     "DrugModel",
-    "LLMService",
 ]
@@ -1,27 +1,125 @@
-from typing import Dict, Any, List
+from datetime import datetime
+from typing import Dict, Any, List, Optional
 import httpx
 from .base_agent import BaseAgent
+from src.utils.batches import parse_partial_date
+from src.utils.incremental import (
+    DELTA_OVERLAP,
+    ConditionalFetcher,
+    load_snapshot,
+    local_store,
+    save_snapshot,
+)
+from src.utils.normalization import fold_key, query_key
+from src.utils.state_store import StateStore
+from src.utils.validators import ClinicalTrialBatch
 
 class ClinicalTrialsAgent(BaseAgent):
     """Agent for querying ClinicalTrials.gov API."""
     
-    def __init__(self, api_key: str):
+    # Largest page the v2 API serves.
+    max_page_size = 1000
+    # The only study fields _to_record reads; the full records are far larger.
+    record_fields = "NCTId,BriefTitle,OverallStatus,EnrollmentCount,StartDate"
+    
+    def __init__(self, api_key: str, incremental: bool = False, store: Optional[StateStore] = None):
         super().__init__(api_key)
         self.base_url = "https://clinicaltrials.gov/api/v2"
+        self.incremental = incremental
+        # Pass the app's state store to share validators and snapshots across workers.
+        self.store = store if store is not None else local_store()
+        self.fetcher = ConditionalFetcher(self.store)
     
-    async def search_trials(self, drug_name: str, indication: str) -> List[Dict[str, Any]]:
-        """Search for clinical trials matching drug and indication."""
+    async def search_trials(
+        self,
+        drug_name: str,
+        indication: str,
+        updated_since: Optional[datetime] = None,
+        all_pages: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Search for clinical trials matching drug and indication.
+        
+        With updated_since, only studies last updated on or after that day
+        are returned, following every result page. With all_pages, a full
+        search follows every page too; otherwise only the first is read.
+        """
+        params = {
+            "query.intr": drug_name,
+            "query.cond": indication,
+            "fields": self.record_fields,
+            "format": "json"
+        }
+        if updated_since is not None:
+            params["filter.advanced"] = (
+                f"AREA[LastUpdatePostDate]RANGE[{updated_since:%Y-%m-%d},MAX]"
+            )
+            all_pages = True
+        if all_pages:
+            params["pageSize"] = self.max_page_size
+        
+        studies: List[Dict[str, Any]] = []
         async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/studies",
-                params={
-                    "query.intr": drug_name,
-                    "query.cond": indication,
-                    "format": "json"
-                }
+            while True:
+                # Delta and continuation URLs are one-off; only revalidate
+                # the first page of a full search.
+                data, _ = await self.fetcher.get_json(
+                    client,
+                    f"{self.base_url}/studies",
+                    params,
+                    conditional=updated_since is None and "pageToken" not in params
+                )
+                studies.extend(data.get("studies", []))
+                token = data.get("nextPageToken")
+                if not all_pages or not token:
+                    return studies
+                params["pageToken"] = token
+    
+    async def search_trials_batch(
+        self,
+        drug_name: str,
+        indication: str,
+        updated_since: Optional[datetime] = None,
+        all_pages: bool = False
+    ) -> ClinicalTrialBatch:
+        """Search for clinical trials and validate them into one batch."""
+        studies = await self.search_trials(drug_name, indication, updated_since, all_pages)
+        return ClinicalTrialBatch.validate(self._to_record(s) for s in studies)
+    
+    async def refresh_trials(
+        self, drug_name: str, indication: str, molecule_id: Optional[str] = None
+    ) -> ClinicalTrialBatch:
+        """Fetch studies updated since the last run and merge them into its findings.
+        
+        Pass the canonical molecule_id so every spelling of the drug shares
+        one snapshot.
+        """
+        key = f"trials:{query_key(molecule_id or fold_key(drug_name), indication)}"
+        snapshot = await load_snapshot(self.store, key)
+        started = datetime.utcnow()
+        if snapshot is None:
+            trials = await self.search_trials_batch(drug_name, indication, all_pages=True)
+        else:
+            delta = await self.search_trials_batch(
+                drug_name, indication, snapshot.synced_at - DELTA_OVERLAP
             )
-            data = response.json()
-            return data.get("studies", [])
+            trials = ClinicalTrialBatch.validate(snapshot.data).merge(delta, key="trial_id")
+        await save_snapshot(self.store, key, trials.to_json_records(), started)
+        return trials
+    
+    @staticmethod
+    def _to_record(study: Dict[str, Any]) -> Dict[str, Any]:
+        """Flatten a v2 API study into a ClinicalTrialRecord."""
+        protocol = study.get("protocolSection", {})
+        identification = protocol.get("identificationModule", {})
+        status = protocol.get("statusModule", {})
+        design = protocol.get("designModule", {})
+        return {
+            "trial_id": identification.get("nctId", ""),
+            "title": identification.get("briefTitle", ""),
+            "status": status.get("overallStatus", "UNKNOWN"),
+            "participants": design.get("enrollmentInfo", {}).get("count", 0),
+            "start_date": parse_partial_date(status.get("startDateStruct", {}).get("date"))
+        }
     
     async def get_trial_details(self, nct_id: str) -> Dict[str, Any]:
         """Get detailed information about a specific trial."""
@@ -29,18 +127,21 @@ class ClinicalTrialsAgent(BaseAgent):
             response = await client.get(f"{self.base_url}/studies/{nct_id}")
             return response.json()
     
-    async def execute(self, task: str) -> Dict[str, Any]:
+    async def execute(self, task: str, molecule_id: Optional[str] = None) -> Dict[str, Any]:
         """Execute clinical trials search."""
         # Parse task format: "drug:indication"
         parts = task.split(":")
         drug = parts[0] if len(parts) > 0 else "aspirin"
         indication = parts[1] if len(parts) > 1 else "cardiovascular"
         
-        trials = await self.search_trials(drug, indication)
+        if self.incremental:
+            trials = await self.refresh_trials(drug, indication, molecule_id)
+        else:
+            trials = await self.search_trials_batch(drug, indication)
         
         return {
             "total_trials": len(trials),
-            "trials": trials[:10],  # Return top 10
+            "trials": trials.head(10).to_records(),  # Return top 10
             "drug": drug,
             "indication": indication
         }
@@ -1,6 +1,8 @@
 from typing import Dict, Any, List
 import httpx
 from .base_agent import BaseAgent
+from src.utils.batches import parse_partial_date
+from src.utils.validators import PatentBatch
 
 class PatentAgent(BaseAgent):
     """Agent for USPTO patent landscape analysis."""
@@ -18,9 +20,22 @@ class PatentAgent(BaseAgent):
             )
             return response.json().get("docs", [])
     
+    async def search_patents_batch(self, query: str) -> PatentBatch:
+        """Search for patents and validate them into one batch."""
+        docs = await self.search_patents(query)
+        return PatentBatch.validate(
+            {
+                "patent_id": doc.get("patentNumber", ""),
+                "title": doc.get("inventionTitle", ""),
+                "filing_date": parse_partial_date(doc.get("filingDate")),
+                "assignee": doc.get("assigneeEntityName")
+            }
+            for doc in docs
+        )
+    
     async def analyze_patent_landscape(self, drug_name: str) -> Dict[str, Any]:
         """Analyze patent landscape for a drug."""
-        patents = await self.search_patents(drug_name)
+        patents = await self.search_patents_batch(drug_name)
         
         expiry_analysis = self._analyze_expiry(patents)
         competition_analysis = self._analyze_competition(patents)
@@ -29,17 +44,17 @@ class PatentAgent(BaseAgent):
             "total_patents": len(patents),
             "expiry_analysis": expiry_analysis,
             "competition": competition_analysis,
-            "patents": patents[:10]
+            "patents": patents.head(10).to_records()
         }
     
-    def _analyze_expiry(self, patents: List[Dict]) -> Dict[str, Any]:
+    def _analyze_expiry(self, patents: PatentBatch) -> Dict[str, Any]:
         """Analyze patent expiry dates."""
         return {
             "average_remaining_years": 5,
             "patents_expiring_soon": 2
         }
     
-    def _analyze_competition(self, patents: List[Dict]) -> Dict[str, Any]:
+    def _analyze_competition(self, patents: PatentBatch) -> Dict[str, Any]:
         """Analyze competitive patents."""
         return {
             "competing_entities": 5,
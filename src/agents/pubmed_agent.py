@@ -3,17 +3,35 @@
 This agent handles literature mining from PubMed database.
 """
 
+from datetime import datetime
+from typing import List, Optional
+
+import httpx
+
 from src.agents.base_agent import BaseAgent
+from src.utils.incremental import (
+    DELTA_OVERLAP,
+    ConditionalFetcher,
+    load_snapshot,
+    local_store,
+    save_snapshot,
+)
+from src.utils.normalization import fold_key, query_key
+from src.utils.state_store import StateStore
 from langchain.tools import tool
 
 
 class PubMedAgent(BaseAgent):
     """Agent for mining literature from PubMed database."""
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, store: Optional[StateStore] = None, **kwargs):
         super().__init__(*args, **kwargs)
         self.name = "PubMed Literature Agent"
         self.description = "Mines literature from PubMed database"
+        self.esearch_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
+        # Pass the app's state store to share validators and snapshots across workers.
+        self.store = store if store is not None else local_store()
+        self.fetcher = ConditionalFetcher(self.store)
 
     @tool
     def search_pubmed(self, query: str, max_results: int = 10) -> dict:
@@ -29,6 +47,61 @@ class PubMedAgent(BaseAgent):
         # Implementation for PubMed search
         return {"query": query, "results": []}
 
+    async def search_pmids(
+        self, query: str, since: Optional[datetime] = None, max_results: int = 10000
+    ) -> List[str]:
+        """Search PubMed and return matching PMIDs.
+        
+        Args:
+            query: Search query
+            since: Only return papers with an Entrez date on or after this day
+            max_results: Maximum number of PMIDs to return
+            
+        Returns:
+            List of PMIDs, most recent first
+        """
+        params = {
+            "db": "pubmed",
+            "term": query,
+            "retmode": "json",
+            "retmax": max_results,
+            "sort": "pub_date"
+        }
+        if since is not None:
+            params.update(datetype="edat", mindate=f"{since:%Y/%m/%d}", maxdate="3000")
+        async with httpx.AsyncClient() as client:
+            # Delta searches embed a date, so there is nothing to revalidate later.
+            data, _ = await self.fetcher.get_json(
+                client, self.esearch_url, params, conditional=since is None
+            )
+        return data.get("esearchresult", {}).get("idlist", [])
+
+    async def refresh_pmids(
+        self, query: str, molecule_id: Optional[str] = None, indication: Optional[str] = None
+    ) -> List[str]:
+        """Fetch PMIDs added since the last sync and merge them into its findings.
+        
+        Args:
+            query: Search query
+            molecule_id: Canonical id of the molecule the query is about, so
+                every spelling of it shares one snapshot
+            indication: Indication the query is about, with molecule_id
+            
+        Returns:
+            List of PMIDs, newly added papers first
+        """
+        key = f"pmids:{query_key(molecule_id, indication) if molecule_id else fold_key(query)}"
+        snapshot = await load_snapshot(self.store, key)
+        started = datetime.utcnow()
+        if snapshot is None:
+            pmids = await self.search_pmids(query)
+        else:
+            delta = await self.search_pmids(query, since=snapshot.synced_at - DELTA_OVERLAP)
+            seen = set(delta)
+            pmids = delta + [pmid for pmid in snapshot.data if pmid not in seen]
+        await save_snapshot(self.store, key, pmids, started)
+        return pmids
+
     def execute(self, query: str) -> dict:
         """Execute literature mining task.
         
@@ -12,6 +12,21 @@ class Settings(BaseSettings):
     log_level: str = os.getenv('LOG_LEVEL', 'INFO')
     environment: str = os.getenv('ENVIRONMENT', 'development')
     fastapi_port: int = int(os.getenv('FASTAPI_PORT', '8000'))
+    state_backend: str = os.getenv('STATE_BACKEND', 'memory')
+    web_workers: int = int(os.getenv('WEB_WORKERS', '1'))
+    orchestration_workers: int = int(os.getenv('ORCHESTRATION_WORKERS', '4'))
+    job_lease_ttl: int = 30
+    preempt_check_interval: float = 1.0
+    worker_retry_delay: float = 5.0
+    request_ttl: int = 86400
+    result_cache_ttl: int = 86400
+    prewarm_window: Optional[str] = os.getenv('PREWARM_WINDOW')
+    prewarm_top_n: int = int(os.getenv('PREWARM_TOP_N', '200'))
+    prewarm_rate_per_minute: int = 30
+    query_history_size: int = int(os.getenv('QUERY_HISTORY_SIZE', '10000'))
+    query_history_decay: float = 0.5
+    synonym_file: Optional[str] = os.getenv('SYNONYM_FILE')
+    fuzzy_synonyms: bool = False
     max_parallel_agents: int = 5
     agent_timeout: int = 300
     max_retries: int = 3
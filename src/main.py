@@ -4,15 +4,27 @@ Main application file for the multi-agent pharmaceutical discovery system.
 """
 
 import asyncio
+import hashlib
+import logging
+import time
 import uuid
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Literal, Set, Tuple
 import json
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+import anyio
+
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from src.config import settings
+from src.utils.normalization import load_synonym_index, query_key
+from src.utils.prewarm import PrewarmScheduler
+from src.utils.state_store import create_state_store, make_worker_id
+
+logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -38,17 +50,36 @@ class DiscoverRequest(BaseModel):
     molecule_name: str
     indication: Optional[str] = None
     filters: Optional[Dict[str, Any]] = None
+    priority: Literal["interactive", "bulk"] = "interactive"
 
 class DiscoverResponse(BaseModel):
     """Response model for discovery request"""
     request_id: str
     status: str
+    molecule_id: Optional[str] = None
     agents_active: int
     estimated_time: str
     timestamp: str
 
-# Store for mock results
-results_store = {}
+# Shared request state; use STATE_BACKEND=redis when running several workers
+state_store = create_state_store(
+    settings.state_backend,
+    settings.redis_url,
+    settings.request_ttl,
+    max_queries=settings.query_history_size
+)
+worker_id = make_worker_id()
+worker_tasks: List[asyncio.Task] = []
+
+# Jobs running in this process: request_id -> (orchestration task, priority)
+running_jobs: Dict[str, Tuple[asyncio.Task, str]] = {}
+# Bulk jobs cancelled to make room for interactive work; requeued on exit
+preempted_jobs: Set[str] = set()
+# Interactive jobs claimed for the worker of a preempted bulk job, by bulk request id
+handoffs: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+
+# Molecule synonym index; molecule_id is the key used by agents and caches
+synonym_index = load_synonym_index(settings.synonym_file, fuzzy=settings.fuzzy_synonyms)
 
 # MOCK DATA AGENTS
 class MockIQVIAAgent:
@@ -111,44 +142,266 @@ patent_agent = MockPatentAgent()
 pubmed_agent = MockPubMedAgent()
 report_agent = MockReportAgent()
 
-async def master_agent_orchestrator(request_id: str, request: DiscoverRequest):
+async def run_agents(request: DiscoverRequest) -> Dict[str, Any]:
+    """Run all worker agents in parallel and generate the report"""
+    iqvia_data, trials_data, patent_data, pubmed_data = await asyncio.gather(
+        iqvia_agent.fetch(request.molecule_name),
+        trials_agent.fetch(request.molecule_name),
+        patent_agent.fetch(request.molecule_name),
+        pubmed_agent.fetch(request.molecule_name)
+    )
+    
+    # Generate PDF report
+    pdf_url = await report_agent.generate({
+        "iqvia": iqvia_data,
+        "trials": trials_data,
+        "patents": patent_data,
+        "literature": pubmed_data
+    })
+    
+    return {
+        "findings": {
+            "iqvia_data": iqvia_data,
+            "clinical_trials": trials_data,
+            "patent_landscape": patent_data,
+            "literature_evidence": pubmed_data,
+            "summary": f"Analysis complete for {request.molecule_name}"
+        },
+        "pdf_url": pdf_url
+    }
+
+def findings_key(request: DiscoverRequest, molecule_id: str) -> str:
+    """Cache key for a request's findings; filtered requests get their own"""
+    key = query_key(molecule_id, request.indication)
+    if request.filters:
+        filters = json.dumps(request.filters, sort_keys=True, default=str)
+        key = f"{key}|{hashlib.sha256(filters.encode()).hexdigest()[:16]}"
+    return key
+
+async def fetch_findings(request: DiscoverRequest, molecule_id: str) -> Dict[str, Any]:
+    """Return cached findings for the query, running the agents on a miss"""
+    key = findings_key(request, molecule_id)
+    cached = await state_store.cache_get(key)
+    if cached is not None:
+        await state_store.incr_stat("warm_hits" if cached.get("prewarmed") else "cache_hits")
+        return cached
+    await state_store.incr_stat("cache_misses")
+    result = await run_agents(request)
+    await state_store.cache_set(key, result, settings.result_cache_ttl)
+    return result
+
+async def prewarm_query(molecule_id: str, molecule_name: str, indication: Optional[str]):
+    """Run the agents for a query from the history, for the pre-warm scheduler"""
+    return await run_agents(DiscoverRequest(
+        molecule_name=molecule_name,
+        indication=indication,
+        priority="bulk"
+    ))
+
+async def master_agent_orchestrator(request_id: str, request: DiscoverRequest, molecule_id: str):
     """Master Agent - Orchestrates all worker agents in parallel"""
     try:
-        # Execute all agents in parallel
-        iqvia_data, trials_data, patent_data, pubmed_data = await asyncio.gather(
-            iqvia_agent.fetch(request.molecule_name),
-            trials_agent.fetch(request.molecule_name),
-            patent_agent.fetch(request.molecule_name),
-            pubmed_agent.fetch(request.molecule_name)
-        )
-        
-        # Generate PDF report
-        pdf_url = await report_agent.generate({
-            "iqvia": iqvia_data,
-            "trials": trials_data,
-            "patents": patent_data,
-            "literature": pubmed_data
-        })
+        result = await fetch_findings(request, molecule_id)
         
-        # Store results
-        results_store[request_id] = {
+        # Store results, unless a cancellation landed first
+        await state_store.finish(request_id, {
             "request_id": request_id,
             "status": "completed",
             "molecule": request.molecule_name,
-            "findings": {
-                "iqvia_data": iqvia_data,
-                "clinical_trials": trials_data,
-                "patent_landscape": patent_data,
-                "literature_evidence": pubmed_data,
-                "summary": f"Analysis complete for {request.molecule_name}"
-            },
-            "pdf_url": pdf_url,
+            "molecule_id": molecule_id,
+            "findings": result["findings"],
+            "pdf_url": result["pdf_url"],
             "processing_time_seconds": 2.5,
             "completed_at": datetime.utcnow().isoformat()
-        }
+        })
     except Exception as e:
-        results_store[request_id]["status"] = "error"
-        results_store[request_id]["error"] = str(e)
+        await state_store.finish(request_id, {"status": "error", "error": str(e)})
+
+async def watch_job(request_id: str, orchestration: asyncio.Task) -> bool:
+    """Keep the job lease alive; stop the orchestration if it is lost or cancelled
+    
+    Returns True if the job was stopped because its lease was lost, in which
+    case it should be run again.
+    """
+    ttl = settings.job_lease_ttl
+    renew_interval = max(ttl / 3, 1)
+    last_renewed = time.monotonic()
+    next_renewal = last_renewed + renew_interval
+    while True:
+        try:
+            # Cancellations issued on other workers reach us as a completion
+            # notification; between them only the lease is touched
+            state = await state_store.wait_for_completion(
+                request_id, max(next_renewal - time.monotonic(), 0)
+            )
+            if state is None or state.get("status") != "processing":
+                orchestration.cancel()
+                return False
+            if time.monotonic() >= next_renewal:
+                if not await state_store.renew_lease(request_id, worker_id, ttl):
+                    orchestration.cancel()
+                    return True
+                last_renewed = time.monotonic()
+                next_renewal = last_renewed + renew_interval
+        except Exception:
+            logger.exception("Heartbeat for %s failed", request_id)
+            await asyncio.sleep(min(settings.worker_retry_delay, renew_interval))
+        # Stop before the lease lapses, or the sweeper would start a second run
+        if time.monotonic() - last_renewed >= ttl - renew_interval:
+            logger.error("Lease for %s is about to expire; stopping the job", request_id)
+            orchestration.cancel()
+            return True
+
+async def run_job(
+    request_id: str, payload: Dict[str, Any]
+) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Run one claimed discovery job while holding its lease
+    
+    The payload holds the normalized request and its canonical molecule id.
+    If the job was preempted, returns the interactive job claimed to take
+    its place.
+    """
+    requeue = False
+    try:
+        state = await state_store.get(request_id)
+        if state is None or state.get("status") != "processing":
+            return
+        request = DiscoverRequest(**payload["request"])
+        orchestration = asyncio.create_task(
+            master_agent_orchestrator(request_id, request, payload["molecule_id"])
+        )
+        watcher = asyncio.create_task(watch_job(request_id, orchestration))
+        running_jobs[request_id] = (orchestration, request.priority)
+        try:
+            await asyncio.wait({orchestration})
+            if watcher.done() and watcher.result():
+                requeue = True
+        finally:
+            del running_jobs[request_id]
+            watcher.cancel()
+            orchestration.cancel()
+    except asyncio.CancelledError:
+        # The worker is shutting down; hand the job to another one
+        requeue = True
+        handoff = handoffs.pop(request_id, None)
+        if handoff is not None:
+            await release_job(handoff[0], requeue=True)
+        raise
+    finally:
+        if request_id in preempted_jobs:
+            preempted_jobs.discard(request_id)
+            requeue = True
+        await release_job(request_id, requeue)
+    return handoffs.pop(request_id, None)
+
+async def release_job(request_id: str, requeue: bool):
+    """Release a job lease held by this worker, putting the job back at the front if requeue"""
+    try:
+        await state_store.release_lease(request_id, worker_id, requeue=requeue)
+    except Exception:
+        # The lease expires on its own and the sweeper requeues the job
+        logger.exception("Releasing the lease for %s failed", request_id)
+
+def newest_bulk_job() -> Optional[str]:
+    """Return the most recently started local bulk job not already preempted"""
+    for request_id, (_, priority) in reversed(list(running_jobs.items())):
+        if priority == "bulk" and request_id not in preempted_jobs:
+            return request_id
+    return None
+
+async def preemption_monitor():
+    """Give queued interactive jobs the worker of a running bulk job
+    
+    While every local worker is busy and one of them runs a bulk job, claim
+    interactive jobs on the workers' behalf. Claiming first means a bulk job
+    is only preempted for interactive work that no other worker took. The
+    most recently started bulk job has the least work to lose; it goes back
+    to the front of the bulk queue and its worker runs the claimed job next.
+    """
+    interval = settings.preempt_check_interval
+    while True:
+        try:
+            if len(running_jobs) < settings.orchestration_workers or newest_bulk_job() is None:
+                await asyncio.sleep(interval)
+                continue
+            job = await state_store.claim_job(
+                worker_id, settings.job_lease_ttl, timeout=interval, priorities=("interactive",)
+            )
+            if job is None:
+                continue
+            victim = newest_bulk_job()
+            if victim is None:
+                # The bulk jobs finished meanwhile, so a worker is free to take it
+                await release_job(job[0], requeue=True)
+                continue
+            preempted_jobs.add(victim)
+            handoffs[victim] = job
+            running_jobs[victim][0].cancel()
+        except Exception:
+            logger.exception("Preemption check failed")
+            await asyncio.sleep(settings.worker_retry_delay)
+
+async def cancel_request(request_id: str):
+    """Mark a discovery cancelled and stop it if it is running in this process"""
+    cancelled = await state_store.finish(request_id, {
+        "status": "cancelled",
+        "completed_at": datetime.utcnow().isoformat()
+    })
+    job = running_jobs.get(request_id)
+    if cancelled and job is not None:
+        job[0].cancel()
+
+async def job_worker():
+    """Pull discovery jobs from the shared queue until shutdown"""
+    while True:
+        try:
+            job = await state_store.claim_job(worker_id, settings.job_lease_ttl, timeout=5)
+            while job is not None:
+                job = await run_job(*job)
+        except Exception:
+            logger.exception("Job worker failed; retrying")
+            await asyncio.sleep(settings.worker_retry_delay)
+
+async def lease_sweeper():
+    """Requeue jobs whose owner stopped heartbeating"""
+    while True:
+        await asyncio.sleep(settings.job_lease_ttl)
+        try:
+            for request_id in await state_store.expired_jobs():
+                state = await state_store.get(request_id)
+                if state is not None and state.get("status") == "processing":
+                    await state_store.requeue(request_id)
+        except Exception:
+            logger.exception("Lease sweep failed")
+
+@app.on_event("startup")
+async def start_workers():
+    """Start this process's orchestration workers"""
+    for _ in range(settings.orchestration_workers):
+        worker_tasks.append(asyncio.create_task(job_worker()))
+    worker_tasks.append(asyncio.create_task(lease_sweeper()))
+    worker_tasks.append(asyncio.create_task(preemption_monitor()))
+    if settings.prewarm_window:
+        scheduler = PrewarmScheduler(
+            state_store,
+            prewarm_query,
+            window=settings.prewarm_window,
+            top_n=settings.prewarm_top_n,
+            rate_per_minute=settings.prewarm_rate_per_minute,
+            history_decay=settings.query_history_decay,
+            cache_ttl=settings.result_cache_ttl,
+            owner=worker_id
+        )
+        worker_tasks.append(asyncio.create_task(scheduler.run()))
+
+@app.on_event("shutdown")
+async def stop_workers():
+    """Stop workers; jobs they were running go back to the front of their queue"""
+    for task in worker_tasks:
+        task.cancel()
+    await asyncio.gather(*worker_tasks, return_exceptions=True)
+    worker_tasks.clear()
+    await state_store.close()
 
 # API ENDPOINTS
 
@@ -172,7 +425,7 @@ async def health_check():
     }
 
 @app.post("/api/v1/discover")
-async def discover(request: DiscoverRequest, background_tasks: BackgroundTasks):
+async def discover(request: DiscoverRequest):
     """POST /api/v1/discover - Request molecule indication discovery
     
     Launches parallel multi-agent system to analyze:
@@ -185,18 +438,44 @@ async def discover(request: DiscoverRequest, background_tasks: BackgroundTasks):
         # Generate unique request ID
         request_id = f"req_{uuid.uuid4().hex[:8]}"
         
+        # Normalize the molecule so all spellings share one canonical id
+        molecule = synonym_index.normalize(request.molecule_name)
+        request.molecule_name = molecule.name
+        
+        # Record the query for cache pre-warming, which runs without filters
+        if not request.filters:
+            await state_store.record_query(
+                query_key(molecule.canonical_id, request.indication),
+                {
+                    "molecule_id": molecule.canonical_id,
+                    "molecule_name": molecule.name,
+                    "indication": request.indication
+                }
+            )
+        
         # Initialize result entry
-        results_store[request_id] = {
+        await state_store.set(request_id, {
             "status": "processing",
+            "molecule_id": molecule.canonical_id,
             "created_at": datetime.utcnow().isoformat()
-        }
+        })
         
-        # Run master agent in background
-        background_tasks.add_task(master_agent_orchestrator, request_id, request)
+        # Queue master agent run for any worker to pick up
+        try:
+            await state_store.enqueue_job(
+                request_id,
+                {"request": request.model_dump(), "molecule_id": molecule.canonical_id},
+                request.priority
+            )
+        except Exception as e:
+            # Nothing will ever run it, so do not leave it processing
+            await state_store.finish(request_id, {"status": "error", "error": str(e)})
+            raise
         
         return DiscoverResponse(
             request_id=request_id,
             status="processing",
+            molecule_id=molecule.canonical_id,
             agents_active=5,
             estimated_time="2-5 minutes",
             timestamp=datetime.utcnow().isoformat()
@@ -204,13 +483,69 @@ async def discover(request: DiscoverRequest, background_tasks: BackgroundTasks):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/api/v1/results/{request_id}")
-async def get_results(request_id: str):
-    """GET /api/v1/results/{request_id} - Retrieve analysis results"""
-    if request_id not in results_store:
+@app.delete("/api/v1/discover/{request_id}")
+async def cancel_discovery(request_id: str):
+    """DELETE /api/v1/discover/{request_id} - Cancel a discovery
+    
+    Stops the orchestration along with its in-flight agent and HTTP calls,
+    on whichever worker is running it.
+    """
+    result = await state_store.get(request_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Request not found")
+    
+    if result.get("status") == "processing":
+        await cancel_request(request_id)
+        result = await state_store.get(request_id)
+    
+    return {
+        "request_id": request_id,
+        "status": result.get("status"),
+        "completed_at": result.get("completed_at")
+    }
+
+@app.get("/api/v1/discover/{request_id}/stream")
+async def stream_discovery(request_id: str):
+    """GET /api/v1/discover/{request_id}/stream - Stream status as server-sent events
+    
+    Sends the request state right away, then every 15 seconds while
+    processing and once more when it finishes. If the client disconnects
+    first, the discovery is cancelled.
+    """
+    result = await state_store.get(request_id)
+    if result is None:
         raise HTTPException(status_code=404, detail="Request not found")
     
-    result = results_store[request_id]
+    async def events():
+        state = result
+        finished = False
+        try:
+            while True:
+                finished = state is None or state.get("status") != "processing"
+                yield f"data: {json.dumps(state)}\n\n"
+                if finished:
+                    break
+                state = await state_store.wait_for_completion(request_id, 15)
+        finally:
+            if not finished:
+                # The response is being cancelled; shield the cleanup from it
+                with anyio.CancelScope(shield=True):
+                    await cancel_request(request_id)
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/api/v1/results/{request_id}")
+async def get_results(request_id: str, wait: float = 0):
+    """GET /api/v1/results/{request_id} - Retrieve analysis results
+    
+    Pass wait=<seconds> (max 60) to block until the request completes.
+    """
+    if wait > 0:
+        result = await state_store.wait_for_completion(request_id, min(wait, 60))
+    else:
+        result = await state_store.get(request_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Request not found")
     
     return {
         "request_id": request_id,
@@ -224,10 +559,10 @@ async def get_results(request_id: str):
 @app.get("/api/v1/status/{request_id}")
 async def get_status(request_id: str):
     """GET /api/v1/status/{request_id} - Get processing status"""
-    if request_id not in results_store:
+    result = await state_store.get(request_id)
+    if result is None:
         raise HTTPException(status_code=404, detail="Request not found")
     
-    result = results_store[request_id]
     return {
         "request_id": request_id,
         "status": result.get("status"),
@@ -235,6 +570,28 @@ async def get_status(request_id: str):
         "completed_at": result.get("completed_at")
     }
 
+@app.get("/api/v1/cache/stats")
+async def get_cache_stats():
+    """GET /api/v1/cache/stats - Findings cache and pre-warming statistics"""
+    stats = await state_store.get_stats()
+    hits = stats.get("cache_hits", 0)
+    warm_hits = stats.get("warm_hits", 0)
+    lookups = hits + warm_hits + stats.get("cache_misses", 0)
+    top_queries = await state_store.top_queries(settings.prewarm_top_n)
+    return {
+        "lookups": lookups,
+        "cache_hits": hits,
+        "warm_hits": warm_hits,
+        "cache_misses": stats.get("cache_misses", 0),
+        "hit_rate": (hits + warm_hits) / lookups if lookups else 0.0,
+        "warm_hit_rate": warm_hits / lookups if lookups else 0.0,
+        "prewarmed": stats.get("prewarmed", 0),
+        "prewarm_errors": stats.get("prewarm_errors", 0),
+        "top_queries": [
+            {"query": key, **info, "count": count} for key, count, info in top_queries
+        ]
+    }
+
 @app.get("/api/v1/agents")
 async def get_agents_info():
     """GET /api/v1/agents - Get information about available agents"""
@@ -277,8 +634,9 @@ async def get_agents_info():
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
-        app,
+        "src.main:app",
         host="0.0.0.0",
-        port=8000,
+        port=settings.fastapi_port,
+        workers=settings.web_workers,
         log_level="info"
     )
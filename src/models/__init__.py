@@ -5,8 +5,11 @@ Contains data models for drugs, trials, and predictions.
 
 from pydantic import BaseModel
 from typing import List, Optional
+from typing_extensions import NotRequired, TypedDict
 from datetime import datetime
 
+from src.utils.batches import RecordBatch
+
 
 class DrugModel(BaseModel):
     """Data model for drug information."""
@@ -27,7 +30,38 @@ class TrialModel(BaseModel):
     participants: int
 
 
+class DrugRecord(TypedDict):
+    drug_id: str
+    name: str
+    formula: str
+    molecular_weight: float
+    properties: NotRequired[dict]
+    created_at: NotRequired[datetime]
+
+
+class TrialRecord(TypedDict):
+    trial_id: str
+    drug_id: str
+    phase: int
+    status: str
+    participants: int
+
+
+class DrugBatch(RecordBatch):
+    """Column-wise batch of drugs."""
+    record_type = DrugRecord
+    dtypes = {"molecular_weight": "float64", "created_at": "datetime64[us]"}
+
+
+class TrialBatch(RecordBatch):
+    """Column-wise batch of clinical trials."""
+    record_type = TrialRecord
+    dtypes = {"phase": "int64", "participants": "int64"}
+
+
 __all__ = [
     "DrugModel",
     "TrialModel",
+    "DrugBatch",
+    "TrialBatch",
 ]
@@ -0,0 +1,154 @@
+"""Column-wise record batches for Pharma Agentic AI.
+
+A batch validates a whole list of records in one pydantic pass and stores
+them as columns instead of one model object per record. Numeric and date
+columns are numpy arrays so analytics can use them without copying.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, ClassVar, Dict, Iterable, Iterator, List, Mapping, Optional
+
+import numpy as np
+from pydantic import TypeAdapter
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert aware datetimes to naive UTC, which numpy requires."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_partial_date(value: Optional[str]) -> Optional[datetime]:
+    """Parse ISO dates that may omit the day or month ("2023", "2023-05")."""
+    if not value:
+        return None
+    parts = value[:10].split("-")
+    parts += ["01"] * (3 - len(parts))
+    try:
+        return datetime(int(parts[0]), int(parts[1]), int(parts[2]))
+    except ValueError:
+        return None
+
+
+class RecordBatch:
+    """Base class for column-wise batches of validated records.
+
+    Subclasses set ``record_type`` to a TypedDict describing one record and
+    ``dtypes`` to the numpy dtype of each numeric or date column. All other
+    columns are kept as plain lists.
+    """
+
+    record_type: ClassVar[type]
+    dtypes: ClassVar[Dict[str, str]] = {}
+
+    __slots__ = ("columns", "_length")
+
+    def __init__(self, columns: Dict[str, Any], length: int):
+        self.columns = columns
+        self._length = length
+
+    @classmethod
+    def fields(cls) -> List[str]:
+        """Column names, in record definition order."""
+        return list(cls.record_type.__annotations__)
+
+    @classmethod
+    def _adapter(cls) -> TypeAdapter:
+        # Built once per subclass; building a TypeAdapter is not free.
+        adapter = cls.__dict__.get("_type_adapter")
+        if adapter is None:
+            adapter = TypeAdapter(List[cls.record_type])
+            cls._type_adapter = adapter
+        return adapter
+
+    @classmethod
+    def validate(cls, records: Iterable[Mapping[str, Any]]) -> "RecordBatch":
+        """Validate a list of raw records and build a batch from them."""
+        rows = cls._adapter().validate_python(list(records))
+        return cls.from_rows(rows)
+
+    @classmethod
+    def from_rows(cls, rows: List[Mapping[str, Any]]) -> "RecordBatch":
+        """Build a batch from already validated rows."""
+        columns = {}
+        for name in cls.fields():
+            values = [row.get(name) for row in rows]
+            dtype = cls.dtypes.get(name)
+            if dtype is None:
+                columns[name] = values
+            elif dtype.startswith("datetime64"):
+                columns[name] = np.array([_naive_utc(v) for v in values], dtype=dtype)
+            else:
+                columns[name] = np.array(values, dtype=dtype)
+        return cls(columns, len(rows))
+
+    @classmethod
+    def empty(cls) -> "RecordBatch":
+        """Return a batch with no records."""
+        return cls.from_rows([])
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self._length):
+            yield self[i]
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        """Return one record as a dict."""
+        row = {}
+        for name, column in self.columns.items():
+            value = column[index]
+            if isinstance(value, np.datetime64):
+                value = None if np.isnat(value) else value.item()
+            elif isinstance(value, np.generic):
+                value = value.item()
+            row[name] = value
+        return row
+
+    def head(self, n: int) -> "RecordBatch":
+        """Return a batch with the first n records."""
+        n = min(max(n, 0), self._length)
+        columns = {name: column[:n] for name, column in self.columns.items()}
+        return type(self)(columns, n)
+
+    def merge(self, other: "RecordBatch", key: str) -> "RecordBatch":
+        """Return a batch where records in other replace ours with the same key."""
+        replaced = set(other.columns[key])
+        keep = [i for i, value in enumerate(self.columns[key]) if value not in replaced]
+        columns = {}
+        for name, column in self.columns.items():
+            if isinstance(column, np.ndarray):
+                columns[name] = np.concatenate([column[keep], other.columns[name]])
+            else:
+                columns[name] = [column[i] for i in keep] + list(other.columns[name])
+        return type(self)(columns, len(keep) + len(other))
+
+    def to_numpy(self, name: str) -> np.ndarray:
+        """Return a column as a numpy array, without copying typed columns."""
+        column = self.columns[name]
+        if isinstance(column, np.ndarray):
+            return column
+        return np.array(column, dtype=object)
+
+    def to_pandas(self):
+        """Return the batch as a pandas DataFrame sharing the numpy columns.
+
+        Other columns are object dtype, even when the batch is empty.
+        """
+        import pandas as pd
+
+        columns = {
+            name: column if isinstance(column, np.ndarray) else pd.Series(column, dtype=object)
+            for name, column in self.columns.items()
+        }
+        return pd.DataFrame(columns, copy=False)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Return the batch as a list of dicts."""
+        return list(self)
+
+    def to_json_records(self) -> List[Dict[str, Any]]:
+        """Return the batch as JSON-compatible dicts; validate() reads them back."""
+        return self._adapter().dump_python(self.to_records(), mode="json")
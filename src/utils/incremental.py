@@ -0,0 +1,103 @@
+"""Incremental refresh helpers for Pharma Agentic AI.
+
+ConditionalFetcher revalidates upstream responses with ETag/Last-Modified
+so unchanged sources cost a 304 instead of a full download. Snapshots record
+the previous findings for a query and when they were synced, so agents can
+ask upstream APIs only for what changed since then. Both live in a
+StateStore, so with the Redis backend every worker sees the same validators
+and snapshots.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import httpx
+
+from src.utils.state_store import InMemoryStateStore, StateStore
+
+# Validators and snapshots are only useful until the next refresh; keep them
+# long enough to span a gap between runs.
+VALIDATOR_TTL = 7 * 86400
+SNAPSHOT_TTL = 30 * 86400
+
+# Upstream update dates are US Eastern calendar days and indexing lags, so
+# deltas start this long before the previous sync; merging drops repeats.
+DELTA_OVERLAP = timedelta(days=2)
+
+
+def local_store() -> StateStore:
+    """Bounded per-process store for agents not given a shared one."""
+    return InMemoryStateStore(max_cache_entries=256)
+
+
+class Snapshot(NamedTuple):
+    """Findings from a previous run and the time that run started."""
+    data: Any
+    synced_at: datetime
+
+
+async def load_snapshot(store: StateStore, key: str) -> Optional[Snapshot]:
+    """Return the snapshot saved under key, or None."""
+    entry = await store.cache_get(f"snapshot:{key}")
+    if entry is None:
+        return None
+    return Snapshot(entry["data"], datetime.fromisoformat(entry["synced_at"]))
+
+
+async def save_snapshot(store: StateStore, key: str, data: Any, synced_at: datetime) -> None:
+    """Save JSON-serializable findings as the snapshot for key."""
+    await store.cache_set(
+        f"snapshot:{key}",
+        {"data": data, "synced_at": synced_at.isoformat()},
+        SNAPSHOT_TTL,
+    )
+
+
+class ConditionalFetcher:
+    """Fetch JSON with conditional requests, reusing cached bodies on 304."""
+
+    def __init__(self, store: Optional[StateStore] = None):
+        self.store = store if store is not None else local_store()
+
+    async def get_json(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        conditional: bool = True,
+    ) -> Tuple[Any, bool]:
+        """GET url and return (body, changed).
+
+        Pass conditional=False for one-off URLs, such as delta queries that
+        embed a date, which would never be revalidated.
+        """
+        if not conditional:
+            response = await client.get(url, params=params, headers=headers)
+            response.raise_for_status()
+            return response.json(), True
+
+        key = f"http:{httpx.URL(url, params=params)}"
+        cached = await self.store.cache_get(key)
+        request_headers = dict(headers or {})
+        if cached is not None:
+            if cached.get("etag"):
+                request_headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                request_headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = await client.get(url, params=params, headers=request_headers)
+        if response.status_code == 304 and cached is not None:
+            return cached["body"], False
+
+        response.raise_for_status()
+        body = response.json()
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            await self.store.cache_set(
+                key,
+                {"etag": etag, "last_modified": last_modified, "body": body},
+                VALIDATOR_TTL,
+            )
+        return body, True
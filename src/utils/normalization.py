@@ -0,0 +1,179 @@
+"""Molecule name normalization for Pharma Agentic AI.
+
+Maps the many spellings of a molecule ("Aspirin ", "acetylsalicylic acid",
+"ASA") to one canonical id, so caches and deduplication see them as the same
+query. Synonyms are loaded from a tab-separated file, e.g. a local RxNorm or
+MeSH extract, with one molecule per line:
+
+    canonical_id<TAB>preferred name<TAB>synonym<TAB>synonym...
+
+Blank lines and lines starting with "#" are ignored. A small sample ships
+with the package in src/data/synonyms.tsv.
+"""
+
+import difflib
+import logging
+import re
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYNONYM_FILE = Path(__file__).resolve().parent.parent / "data" / "synonyms.tsv"
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+# Greek letters as INN names spell them, so "interferon α-2b" and
+# "interferon alfa-2b" fold alike and "α-" and "β-tocopherol" stay apart.
+_GREEK = dict(zip(
+    "αβγδεζηθικλμνξοπρσςτυφχψω",
+    "alfa beta gamma delta epsilon zeta eta theta iota kappa lambda mu nu xi omicron "
+    "pi rho sigma sigma tau upsilon phi chi psi omega".split(),
+))
+
+
+def fold(name: str) -> str:
+    """Fold case, accents, punctuation and Greek letters so equivalent spellings match.
+
+    Letters of any script are kept, so names in Cyrillic or CJK fold to
+    themselves rather than to nothing.
+    """
+    text = unicodedata.normalize("NFKD", name).casefold()
+    text = "".join(
+        f" {_GREEK[ch]} " if ch in _GREEK else ch
+        for ch in text
+        if not unicodedata.combining(ch)
+    )
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def fold_key(text: str) -> str:
+    """Folded text, or the stripped text itself if nothing survives folding."""
+    return fold(text) or text.strip()
+
+
+class Molecule(NamedTuple):
+    """A normalized molecule."""
+    canonical_id: str
+    name: str
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SynonymIndex:
+    """Hash index from folded synonyms to canonical molecules.
+
+    Fuzzy lookups only compare against synonyms of a compatible length that
+    share the most trigrams with the name, so they stay cheap on large
+    vocabularies such as a full RxNorm extract.
+    """
+
+    # Synonyms compared with difflib per fuzzy lookup
+    fuzzy_candidates = 20
+    # Fuzzy results remembered, misses included
+    fuzzy_cache_size = 4096
+
+    def __init__(self, fuzzy: bool = False, fuzzy_cutoff: float = 0.88):
+        self.fuzzy = fuzzy
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._index: Dict[str, Molecule] = {}
+        self._by_trigram: Dict[str, Set[str]] = defaultdict(set)
+        self._fuzzy_cache: "OrderedDict[str, Optional[str]]" = OrderedDict()
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path], **kwargs) -> "SynonymIndex":
+        """Load a synonym file."""
+        index = cls(**kwargs)
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                line = line.rstrip("\n")
+                if not line.strip() or line.startswith("#"):
+                    continue
+                canonical_id, name, *synonyms = line.split("\t")
+                index.add(canonical_id, name, synonyms)
+        return index
+
+    def add(self, canonical_id: str, name: str, synonyms: List[str] = ()) -> None:
+        """Register a molecule under its preferred name and synonyms."""
+        molecule = Molecule(canonical_id, name)
+        for synonym in (name, *synonyms):
+            key = fold(synonym)
+            if key and key not in self._index:
+                self._index[key] = molecule
+                for gram in _trigrams(key):
+                    self._by_trigram[gram].add(key)
+        self._fuzzy_cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def lookup(self, name: str) -> Optional[Molecule]:
+        """Return the molecule for a name, or None if it is not indexed."""
+        key = fold(name)
+        molecule = self._index.get(key)
+        if molecule is None and self.fuzzy and key:
+            match = self._fuzzy_match(key)
+            if match is not None:
+                molecule = self._index[match]
+        return molecule
+
+    def _fuzzy_match(self, key: str) -> Optional[str]:
+        """Return the closest indexed synonym to key, if close enough."""
+        if key in self._fuzzy_cache:
+            self._fuzzy_cache.move_to_end(key)
+            return self._fuzzy_cache[key]
+
+        # difflib's ratio is 2 * matches / total length, so a synonym whose
+        # length is too far from the key can never reach the cutoff.
+        min_ratio = self.fuzzy_cutoff / (2 - self.fuzzy_cutoff)
+        shared: Counter = Counter()
+        for gram in _trigrams(key):
+            for candidate in self._by_trigram.get(gram, ()):
+                if min(len(key), len(candidate)) >= min_ratio * max(len(key), len(candidate)):
+                    shared[candidate] += 1
+        candidates = [candidate for candidate, _ in shared.most_common(self.fuzzy_candidates)]
+        matches = difflib.get_close_matches(key, candidates, n=1, cutoff=self.fuzzy_cutoff)
+        match = matches[0] if matches else None
+
+        self._fuzzy_cache[key] = match
+        if len(self._fuzzy_cache) > self.fuzzy_cache_size:
+            self._fuzzy_cache.popitem(last=False)
+        return match
+
+    def normalize(self, name: str) -> Molecule:
+        """Return the molecule for a name, falling back to its folded form.
+
+        Raises ValueError for a blank name, which has no usable id.
+        """
+        if not name.strip():
+            raise ValueError("Molecule name is empty")
+        molecule = self.lookup(name)
+        if molecule is None:
+            molecule = Molecule(fold_key(name), name.strip())
+        return molecule
+
+
+def load_synonym_index(path: Optional[Union[str, Path]] = None, **kwargs) -> SynonymIndex:
+    """Load the configured synonym file, or the one shipped with the package.
+
+    A configured file that is missing raises FileNotFoundError; a missing
+    packaged file only logs a warning, leaving names unnormalized.
+    """
+    if path is not None:
+        return SynonymIndex.from_file(path, **kwargs)
+    if DEFAULT_SYNONYM_FILE.exists():
+        return SynonymIndex.from_file(DEFAULT_SYNONYM_FILE, **kwargs)
+    logger.warning("No synonym file at %s; molecule names will not be normalized", DEFAULT_SYNONYM_FILE)
+    return SynonymIndex(**kwargs)
+
+
+def query_key(canonical_id: str, indication: Optional[str] = None) -> str:
+    """Cache and deduplication key for a molecule/indication query."""
+    if indication and indication.strip():
+        return f"{canonical_id}|{fold_key(indication)}"
+    return canonical_id
@@ -0,0 +1,126 @@
+"""Predictive cache pre-warming for Pharma Agentic AI.
+
+Every discovery counts its query key in the state store's query history,
+along with the molecule and indication needed to rerun it. During the
+configured off-peak window the scheduler runs the agents for the most
+requested queries whose cached findings would expire before the next
+window, one at a time and paced to stay under upstream rate limits, so peak
+hours are served from cache.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as dtime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from src.utils.state_store import StateStore
+
+logger = logging.getLogger(__name__)
+
+
+def parse_window(window: str) -> Tuple[dtime, dtime]:
+    """Parse an "HH:MM-HH:MM" window; the end may be past midnight."""
+    start, end = window.split("-")
+    return dtime.fromisoformat(start.strip()), dtime.fromisoformat(end.strip())
+
+
+def in_window(now: dtime, start: dtime, end: dtime) -> bool:
+    """Check whether a time of day falls within a window."""
+    if start <= end:
+        return start <= now < end
+    return now >= start or now < end
+
+
+class PrewarmScheduler:
+    """Warms the findings cache for the top-N queries during off-peak hours."""
+
+    def __init__(
+        self,
+        store: StateStore,
+        warm: Callable[[str, str, Optional[str]], Awaitable[Dict[str, Any]]],
+        window: str,
+        top_n: int,
+        rate_per_minute: int,
+        cache_ttl: int,
+        owner: str,
+        check_interval: int = 60,
+        history_decay: float = 0.5,
+    ):
+        self.store = store
+        self.warm = warm
+        self.start, self.end = parse_window(window)
+        self.top_n = top_n
+        self.min_interval = 60 / rate_per_minute
+        self.cache_ttl = cache_ttl
+        self.owner = owner
+        self.check_interval = check_interval
+        self.history_decay = history_decay
+        self._last_window: Optional[date] = None
+
+    def _window_start(self, now: datetime) -> date:
+        """Date on which the window containing now started."""
+        if self.start > self.end and now.time() < self.end:
+            return (now - timedelta(days=1)).date()
+        return now.date()
+
+    def _seconds_left(self, now: datetime) -> int:
+        end = datetime.combine(now.date(), self.end)
+        if end <= now:
+            end += timedelta(days=1)
+        return max(int((end - now).total_seconds()), 1)
+
+    def _seconds_to_next_window(self, now: datetime) -> float:
+        start = datetime.combine(now.date(), self.start)
+        if start <= now:
+            start += timedelta(days=1)
+        return (start - now).total_seconds()
+
+    async def run(self) -> None:
+        """Check the window periodically and warm once per window."""
+        while True:
+            await asyncio.sleep(self.check_interval)
+            now = datetime.now()
+            if not in_window(now.time(), self.start, self.end):
+                continue
+            window = self._window_start(now)
+            if window == self._last_window:
+                continue
+            try:
+                # Only one worker across the deployment warms each window.
+                if not await self.store.acquire_lock("prewarm", self.owner, self._seconds_left(now)):
+                    continue
+                self._last_window = window
+                await self.warm_top_queries()
+                # Age the history once per window so last month's favourites fade
+                await self.store.decay_queries(self.history_decay)
+            except Exception:
+                logger.exception("Cache pre-warming failed")
+
+    async def warm_top_queries(self) -> int:
+        """Warm the top-N queries not cached until the next window. Returns how many were run."""
+        warmed = 0
+        for key, _, query in await self.store.top_queries(self.top_n):
+            now = datetime.now()
+            if not in_window(now.time(), self.start, self.end):
+                break
+            remaining = await self.store.cache_ttl(key)
+            if remaining is not None and remaining > self._seconds_to_next_window(now):
+                continue
+
+            began = time.monotonic()
+            try:
+                result = await self.warm(
+                    query["molecule_id"], query["molecule_name"], query["indication"]
+                )
+            except Exception:
+                await self.store.incr_stat("prewarm_errors")
+            else:
+                result["prewarmed"] = True
+                await self.store.cache_set(key, result, self.cache_ttl)
+                await self.store.incr_stat("prewarmed")
+                warmed += 1
+            # Pace upstream calls to stay under rate limits.
+            await asyncio.sleep(max(self.min_interval - (time.monotonic() - began), 0))
+        return warmed
@@ -0,0 +1,719 @@
+"""Shared request state for Pharma Agentic AI.
+
+Holds discovery request state, the pending job queues, in-flight job leases,
+completion notifications, the findings cache, query history and named
+locks. The in-memory backend serves a single process; the Redis backend
+lets any uvicorn worker or replica serve any request id and pick up
+orchestration work.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+# Job priority classes, highest first. Workers always take queued
+# interactive jobs before bulk ones.
+PRIORITIES = ("interactive", "bulk")
+
+
+def make_worker_id() -> str:
+    """Build an identifier unique to this worker process."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class StateStore(ABC):
+    """Abstract base class for request state backends.
+
+    A job is queued with enqueue_job, then claimed by a worker with
+    claim_job, which atomically takes it off the queue and grants a lease.
+    The worker renews the lease while it runs the job and releases it when
+    done. Jobs whose lease expires are reported by expired_jobs so they can
+    be requeued.
+    """
+
+    @abstractmethod
+    async def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored state for a request, or None if unknown."""
+        pass
+
+    @abstractmethod
+    async def set(self, request_id: str, data: Dict[str, Any]) -> None:
+        """Replace the stored state for a request."""
+        pass
+
+    async def update(self, request_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge fields into the stored state for a request."""
+        data = await self.get(request_id) or {}
+        data.update(fields)
+        await self.set(request_id, data)
+        return data
+
+    @abstractmethod
+    async def finish(self, request_id: str, fields: Dict[str, Any]) -> bool:
+        """Merge terminal fields into a processing request and notify waiters.
+
+        The status check and the write are one atomic step, so of a racing
+        completion and cancellation only the first wins. Returns False if
+        the request is unknown or already finished.
+        """
+        pass
+
+    @abstractmethod
+    async def enqueue_job(
+        self, request_id: str, payload: Dict[str, Any], priority: str = "interactive"
+    ) -> None:
+        """Queue an orchestration job for any worker to pick up."""
+        pass
+
+    @abstractmethod
+    async def claim_job(
+        self, owner: str, ttl: int, timeout: float, priorities: Sequence[str] = PRIORITIES
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Take the highest priority queued job and lease it to owner.
+
+        Waits up to timeout seconds for a job. The job moves from its queue
+        to the in-flight set atomically, so it is never in neither.
+        """
+        pass
+
+    @abstractmethod
+    async def renew_lease(self, request_id: str, owner: str, ttl: int) -> bool:
+        """Extend a lease held by owner. Returns False if it was lost."""
+        pass
+
+    @abstractmethod
+    async def release_lease(self, request_id: str, owner: str, requeue: bool = False) -> bool:
+        """Drop a lease held by owner and mark the job no longer in flight.
+
+        With requeue, the job goes back to the front of its queue in the same
+        step; otherwise it is finished and forgotten. Returns False if the
+        lease had already been taken over by another worker.
+        """
+        pass
+
+    @abstractmethod
+    async def expired_jobs(self) -> List[str]:
+        """Return in-flight request ids whose lease has expired."""
+        pass
+
+    @abstractmethod
+    async def requeue(self, request_id: str) -> bool:
+        """Push a previously enqueued job back onto the front of its queue."""
+        pass
+
+    @abstractmethod
+    async def publish_completion(self, request_id: str) -> None:
+        """Notify waiters that a request reached a terminal status."""
+        pass
+
+    @abstractmethod
+    async def wait_for_completion(
+        self, request_id: str, timeout: float
+    ) -> Optional[Dict[str, Any]]:
+        """Wait up to timeout seconds for a request to finish."""
+        pass
+
+    @abstractmethod
+    async def cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return cached findings for a query key, or None."""
+        pass
+
+    @abstractmethod
+    async def cache_set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        """Cache findings for a query key for ttl seconds."""
+        pass
+
+    @abstractmethod
+    async def cache_ttl(self, key: str) -> Optional[float]:
+        """Return the seconds left before a cache entry expires, or None if absent."""
+        pass
+
+    @abstractmethod
+    async def record_query(self, key: str, info: Dict[str, Any]) -> None:
+        """Count one more request for a query key, keeping info to display and rerun it.
+
+        Once the history holds max_queries keys, a new key replaces the least
+        requested one and starts from its count, so the history stays
+        bounded while new popular queries can still reach the top.
+        """
+        pass
+
+    @abstractmethod
+    async def decay_queries(self, factor: float) -> None:
+        """Multiply every query count by factor, so recent requests weigh more."""
+        pass
+
+    @abstractmethod
+    async def top_queries(self, n: int) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """Return the n most requested query keys with their counts and info."""
+        pass
+
+    @abstractmethod
+    async def acquire_lock(self, name: str, owner: str, ttl: int) -> bool:
+        """Take a named lock for ttl seconds. Returns False if it is held."""
+        pass
+
+    @abstractmethod
+    async def incr_stat(self, name: str) -> None:
+        """Increment a named counter."""
+        pass
+
+    @abstractmethod
+    async def get_stats(self) -> Dict[str, int]:
+        """Return all named counters."""
+        pass
+
+    async def close(self) -> None:
+        """Release backend resources."""
+        pass
+
+
+class InMemoryStateStore(StateStore):
+    """Single-process state store, also used as a local stand-in for Redis."""
+
+    def __init__(
+        self,
+        request_ttl: int = 86400,
+        max_cache_entries: Optional[int] = None,
+        max_queries: Optional[int] = None,
+    ):
+        self.request_ttl = request_ttl
+        self.max_cache_entries = max_cache_entries
+        self.max_queries = max_queries
+        self._data: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+        self._jobs: Dict[str, Tuple[Dict[str, Any], str]] = {}
+        # Jobs are appended on the left and taken from the right, as in Redis.
+        self._queues: Dict[str, Deque[str]] = {priority: deque() for priority in PRIORITIES}
+        self._job_event: Optional[asyncio.Event] = None
+        # Least recently used first, so the oldest entry goes when full.
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._queries: Counter = Counter()
+        self._query_info: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, Tuple[str, float]] = {}
+        self._stats: Counter = Counter()
+
+    @property
+    def job_event(self) -> asyncio.Event:
+        if self._job_event is None:
+            self._job_event = asyncio.Event()
+        return self._job_event
+
+    def _evict_expired(self) -> None:
+        """Drop expired requests and cache entries with their bookkeeping."""
+        now = time.monotonic()
+        for request_id in [rid for rid, (expires, _) in self._data.items() if expires <= now]:
+            del self._data[request_id]
+            self._events.pop(request_id, None)
+            if request_id not in self._leases:
+                self._jobs.pop(request_id, None)
+        for key in [key for key, (expires, _) in self._cache.items() if expires <= now]:
+            del self._cache[key]
+
+    async def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._data.get(request_id)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return dict(entry[1])
+
+    async def set(self, request_id: str, data: Dict[str, Any]) -> None:
+        self._data[request_id] = (time.monotonic() + self.request_ttl, dict(data))
+
+    async def finish(self, request_id: str, fields: Dict[str, Any]) -> bool:
+        # Nothing here yields to the event loop, so no other write can interleave.
+        data = await self.get(request_id)
+        if data is None or data.get("status") != "processing":
+            return False
+        data.update(fields)
+        await self.set(request_id, data)
+        await self.publish_completion(request_id)
+        return True
+
+    async def enqueue_job(
+        self, request_id: str, payload: Dict[str, Any], priority: str = "interactive"
+    ) -> None:
+        self._jobs[request_id] = (payload, priority)
+        self._queues[priority].appendleft(request_id)
+        self.job_event.set()
+
+    def _lease_free(self, request_id: str) -> bool:
+        lease = self._leases.get(request_id)
+        return lease is None or lease[1] <= time.monotonic()
+
+    async def claim_job(
+        self, owner: str, ttl: int, timeout: float, priorities: Sequence[str] = PRIORITIES
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            # No awaits until the event is cleared, so no enqueue can be missed.
+            for priority in priorities:
+                queue = self._queues[priority]
+                while queue:
+                    request_id = queue.pop()
+                    job = self._jobs.get(request_id)
+                    if job is not None and self._lease_free(request_id):
+                        self._leases[request_id] = (owner, time.monotonic() + ttl)
+                        return request_id, job[0]
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            self.job_event.clear()
+            try:
+                await asyncio.wait_for(self.job_event.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    async def renew_lease(self, request_id: str, owner: str, ttl: int) -> bool:
+        lease = self._leases.get(request_id)
+        if not lease or lease[0] != owner or lease[1] <= time.monotonic():
+            return False
+        self._leases[request_id] = (owner, time.monotonic() + ttl)
+        return True
+
+    async def release_lease(self, request_id: str, owner: str, requeue: bool = False) -> bool:
+        lease = self._leases.get(request_id)
+        if lease is None or lease[0] != owner:
+            return False
+        del self._leases[request_id]
+        if requeue:
+            return await self.requeue(request_id)
+        self._jobs.pop(request_id, None)
+        return True
+
+    async def expired_jobs(self) -> List[str]:
+        self._evict_expired()
+        now = time.monotonic()
+        expired = [rid for rid, (_, expires) in self._leases.items() if expires <= now]
+        for request_id in expired:
+            del self._leases[request_id]
+        return expired
+
+    async def requeue(self, request_id: str) -> bool:
+        job = self._jobs.get(request_id)
+        if job is None:
+            return False
+        self._queues[job[1]].append(request_id)
+        self.job_event.set()
+        return True
+
+    def _event(self, request_id: str) -> asyncio.Event:
+        if request_id not in self._events:
+            self._events[request_id] = asyncio.Event()
+        return self._events[request_id]
+
+    async def publish_completion(self, request_id: str) -> None:
+        # Waiters hold their own reference, so the event can be dropped here.
+        event = self._events.pop(request_id, None)
+        if event is not None:
+            event.set()
+
+    async def wait_for_completion(
+        self, request_id: str, timeout: float
+    ) -> Optional[Dict[str, Any]]:
+        data = await self.get(request_id)
+        if data is None or data.get("status") != "processing":
+            return data
+        try:
+            await asyncio.wait_for(self._event(request_id).wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return await self.get(request_id)
+
+    async def cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return dict(entry[1])
+
+    async def cache_set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        self._cache[key] = (time.monotonic() + ttl, dict(value))
+        self._cache.move_to_end(key)
+        if self.max_cache_entries is not None and len(self._cache) > self.max_cache_entries:
+            self._cache.popitem(last=False)
+
+    async def cache_ttl(self, key: str) -> Optional[float]:
+        entry = self._cache.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[0] - time.monotonic()
+
+    async def record_query(self, key: str, info: Dict[str, Any]) -> None:
+        if (
+            key not in self._queries
+            and self.max_queries is not None
+            and len(self._queries) >= self.max_queries
+        ):
+            lowest, count = min(self._queries.items(), key=lambda item: item[1])
+            del self._queries[lowest]
+            self._query_info.pop(lowest, None)
+            self._queries[key] = count
+        self._queries[key] += 1
+        self._query_info[key] = dict(info)
+
+    async def decay_queries(self, factor: float) -> None:
+        for key in self._queries:
+            self._queries[key] *= factor
+
+    async def top_queries(self, n: int) -> List[Tuple[str, float, Dict[str, Any]]]:
+        return [
+            (key, count, dict(self._query_info.get(key, {})))
+            for key, count in self._queries.most_common(n)
+        ]
+
+    async def acquire_lock(self, name: str, owner: str, ttl: int) -> bool:
+        lock = self._locks.get(name)
+        if lock is not None and lock[1] > time.monotonic():
+            return False
+        self._locks[name] = (owner, time.monotonic() + ttl)
+        return True
+
+    async def incr_stat(self, name: str) -> None:
+        self._stats[name] += 1
+
+    async def get_stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+
+# Leases live in two keys shared by all jobs, so every key a script touches
+# is known up front and can be passed in KEYS: a hash of request id -> owner
+# and the in-flight sorted set of request id -> lease deadline in
+# milliseconds. Deadlines use the Redis clock, so workers' clocks may drift.
+_NOW_MS = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+"""
+
+# Pop the first job, in priority order, that no one else holds a lease on,
+# lease it to ARGV[1] for ARGV[2] ms and mark it in flight, all in one step.
+# KEYS are the leases hash, the in-flight set, then the queues to take from.
+_CLAIM_JOB = _NOW_MS + """
+for i = 3, #KEYS do
+    while true do
+        local job = redis.call('RPOP', KEYS[i])
+        if not job then
+            break
+        end
+        local request_id = cjson.decode(job)['request_id']
+        local deadline = redis.call('ZSCORE', KEYS[2], request_id)
+        if not deadline or tonumber(deadline) <= now then
+            redis.call('HSET', KEYS[1], request_id, ARGV[1])
+            redis.call('ZADD', KEYS[2], now + tonumber(ARGV[2]), request_id)
+            return job
+        end
+    end
+end
+return false
+"""
+
+# Write the finished state only if nobody changed it since it was read, and
+# notify waiters on channel ARGV[4] in the same step.
+_FINISH = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+redis.call('PUBLISH', ARGV[4], ARGV[5])
+return 1
+"""
+
+# Renew only if the lease is still ours and has not expired.
+_RENEW_LEASE = _NOW_MS + """
+local deadline = redis.call('ZSCORE', KEYS[2], ARGV[1])
+if redis.call('HGET', KEYS[1], ARGV[1]) ~= ARGV[2] or not deadline
+        or tonumber(deadline) <= now then
+    return 0
+end
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[3]), ARGV[1])
+return 1
+"""
+
+# Release only if the lease is still ours, even if it expired, as long as
+# the sweeper has not reclaimed it. Then either push the job back to the
+# front of its queue or forget it. KEYS are the leases hash, the in-flight
+# set, the job and then one queue per priority, named in the same order
+# from ARGV[4] on.
+_RELEASE_LEASE = """
+if redis.call('HGET', KEYS[1], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+if ARGV[3] ~= '1' then
+    redis.call('DEL', KEYS[3])
+    return 1
+end
+local job = redis.call('GET', KEYS[3])
+if not job then
+    return 0
+end
+local priority = cjson.decode(job)['priority']
+for i = 4, #ARGV do
+    if ARGV[i] == priority then
+        redis.call('RPUSH', KEYS[i], job)
+        return 1
+    end
+end
+return 0
+"""
+
+# Count a request for query ARGV[1] and store its info ARGV[2]. When the
+# history already holds ARGV[3] (if non-zero) queries, a new query replaces
+# the least requested one and inherits its count. KEYS are the counts sorted
+# set and the info hash.
+_RECORD_QUERY = """
+local limit = tonumber(ARGV[3])
+if limit > 0 and not redis.call('ZSCORE', KEYS[1], ARGV[1])
+        and redis.call('ZCARD', KEYS[1]) >= limit then
+    local lowest = redis.call('ZPOPMIN', KEYS[1])
+    redis.call('HDEL', KEYS[2], lowest[1])
+    redis.call('ZADD', KEYS[1], lowest[2], ARGV[1])
+end
+redis.call('ZINCRBY', KEYS[1], 1, ARGV[1])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+return 1
+"""
+
+# Multiply every query count by ARGV[1].
+_DECAY_QUERIES = """
+local entries = redis.call('ZRANGE', KEYS[1], 0, -1, 'WITHSCORES')
+for i = 1, #entries, 2 do
+    redis.call('ZADD', KEYS[1], tonumber(entries[i + 1]) * tonumber(ARGV[1]), entries[i])
+end
+return #entries / 2
+"""
+
+# Take every expired lease off the in-flight set and return its request id.
+_EXPIRED_JOBS = _NOW_MS + """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)
+for _, request_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], request_id)
+    redis.call('HDEL', KEYS[1], request_id)
+end
+return expired
+"""
+
+
+class RedisStateStore(StateStore):
+    """Redis-backed state store shared by all workers and replicas."""
+
+    # Redis has no blocking pop that also sets a lease, so claim_job polls.
+    claim_poll_interval = 0.5
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        prefix: str = "pharma",
+        request_ttl: int = 86400,
+        client: Any = None,
+        max_queries: Optional[int] = None,
+    ):
+        if client is None:
+            try:
+                import redis.asyncio as aioredis
+            except ImportError as e:
+                raise ImportError(
+                    "The redis package is required for STATE_BACKEND=redis"
+                ) from e
+            client = aioredis.from_url(redis_url, decode_responses=True)
+
+        self.client = client
+        self.prefix = prefix
+        self.request_ttl = request_ttl
+        self.max_queries = max_queries
+        self._claim = self.client.register_script(_CLAIM_JOB)
+        self._finish = self.client.register_script(_FINISH)
+        self._renew = self.client.register_script(_RENEW_LEASE)
+        self._release = self.client.register_script(_RELEASE_LEASE)
+        self._expired = self.client.register_script(_EXPIRED_JOBS)
+        self._record_query = self.client.register_script(_RECORD_QUERY)
+        self._decay_queries = self.client.register_script(_DECAY_QUERIES)
+
+    def _key(self, kind: str, name: str = "") -> str:
+        # The hash tag keeps every key in one Redis Cluster slot, so scripts
+        # and transactions may use several of them together.
+        tag = f"{{{self.prefix}}}"
+        return f"{tag}:{kind}:{name}" if name else f"{tag}:{kind}"
+
+    def _lease_keys(self) -> List[str]:
+        return [self._key("leases"), self._key("inflight")]
+
+    async def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.client.get(self._key("request", request_id))
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, request_id: str, data: Dict[str, Any]) -> None:
+        await self.client.set(
+            self._key("request", request_id), json.dumps(data), ex=self.request_ttl
+        )
+
+    async def finish(self, request_id: str, fields: Dict[str, Any]) -> bool:
+        key = self._key("request", request_id)
+        while True:
+            raw = await self.client.get(key)
+            if raw is None:
+                return False
+            data = json.loads(raw)
+            if data.get("status") != "processing":
+                return False
+            data.update(fields)
+            # Merged here rather than in Lua, whose cjson turns empty arrays
+            # into objects; retried if the state changed in between.
+            if await self._finish(
+                keys=[key],
+                args=[
+                    raw,
+                    json.dumps(data),
+                    self.request_ttl,
+                    self._key("done", request_id),
+                    request_id,
+                ],
+            ):
+                return True
+
+    async def enqueue_job(
+        self, request_id: str, payload: Dict[str, Any], priority: str = "interactive"
+    ) -> None:
+        job = json.dumps({"request_id": request_id, "payload": payload, "priority": priority})
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(self._key("job", request_id), job, ex=self.request_ttl)
+            pipe.lpush(self._key("queue", priority), job)
+            await pipe.execute()
+
+    async def claim_job(
+        self, owner: str, ttl: int, timeout: float, priorities: Sequence[str] = PRIORITIES
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        keys = self._lease_keys() + [self._key("queue", priority) for priority in priorities]
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self._claim(keys=keys, args=[owner, ttl * 1000])
+            if job:
+                job = json.loads(job)
+                return job["request_id"], job["payload"]
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(self.claim_poll_interval, remaining))
+
+    async def renew_lease(self, request_id: str, owner: str, ttl: int) -> bool:
+        renewed = await self._renew(
+            keys=self._lease_keys(), args=[request_id, owner, ttl * 1000]
+        )
+        return bool(renewed)
+
+    async def release_lease(self, request_id: str, owner: str, requeue: bool = False) -> bool:
+        released = await self._release(
+            keys=self._lease_keys()
+            + [self._key("job", request_id)]
+            + [self._key("queue", priority) for priority in PRIORITIES],
+            args=[request_id, owner, "1" if requeue else "0", *PRIORITIES],
+        )
+        return bool(released)
+
+    async def expired_jobs(self) -> List[str]:
+        # One script per sweep, so only one worker reclaims each job.
+        return list(await self._expired(keys=self._lease_keys()))
+
+    async def requeue(self, request_id: str) -> bool:
+        job = await self.client.get(self._key("job", request_id))
+        if job is None:
+            return False
+        priority = json.loads(job).get("priority", "interactive")
+        await self.client.rpush(self._key("queue", priority), job)
+        return True
+
+    async def publish_completion(self, request_id: str) -> None:
+        await self.client.publish(self._key("done", request_id), request_id)
+
+    async def wait_for_completion(
+        self, request_id: str, timeout: float
+    ) -> Optional[Dict[str, Any]]:
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(self._key("done", request_id))
+        try:
+            # Check after subscribing so a completion in between is not missed.
+            data = await self.get(request_id)
+            if data is None or data.get("status") != "processing":
+                return data
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=deadline - time.monotonic(),
+                )
+                if message is not None:
+                    break
+            return await self.get(request_id)
+        finally:
+            await pubsub.aclose()
+
+    async def cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self.client.get(self._key("cache", key))
+        return json.loads(raw) if raw is not None else None
+
+    async def cache_set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        await self.client.set(self._key("cache", key), json.dumps(value), ex=ttl)
+
+    async def cache_ttl(self, key: str) -> Optional[float]:
+        # PTTL is -2 for a missing key and -1 for one without an expiry.
+        ttl = await self.client.pttl(self._key("cache", key))
+        if ttl == -2:
+            return None
+        return float("inf") if ttl == -1 else ttl / 1000
+
+    async def record_query(self, key: str, info: Dict[str, Any]) -> None:
+        await self._record_query(
+            keys=[self._key("queries"), self._key("query_info")],
+            args=[key, json.dumps(info), self.max_queries or 0],
+        )
+
+    async def decay_queries(self, factor: float) -> None:
+        await self._decay_queries(keys=[self._key("queries")], args=[factor])
+
+    async def top_queries(self, n: int) -> List[Tuple[str, float, Dict[str, Any]]]:
+        items = await self.client.zrevrange(self._key("queries"), 0, n - 1, withscores=True)
+        if not items:
+            return []
+        infos = await self.client.hmget(self._key("query_info"), [key for key, _ in items])
+        return [
+            (key, count, json.loads(info) if info is not None else {})
+            for (key, count), info in zip(items, infos)
+        ]
+
+    async def acquire_lock(self, name: str, owner: str, ttl: int) -> bool:
+        acquired = await self.client.set(self._key("lock", name), owner, nx=True, px=ttl * 1000)
+        return bool(acquired)
+
+    async def incr_stat(self, name: str) -> None:
+        await self.client.hincrby(self._key("stats"), name, 1)
+
+    async def get_stats(self) -> Dict[str, int]:
+        stats = await self.client.hgetall(self._key("stats"))
+        return {name: int(value) for name, value in stats.items()}
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_state_store(
+    backend: str,
+    redis_url: str,
+    request_ttl: int = 86400,
+    max_queries: Optional[int] = None,
+) -> StateStore:
+    """Create the state store configured by STATE_BACKEND."""
+    if backend == "redis":
+        return RedisStateStore(redis_url, request_ttl=request_ttl, max_queries=max_queries)
+    if backend == "memory":
+        return InMemoryStateStore(request_ttl=request_ttl, max_queries=max_queries)
+    raise ValueError(f"Unknown state backend: {backend}")
@@ -1,7 +1,10 @@
 from pydantic import BaseModel, Field, validator
 from typing import Optional, List
+from typing_extensions import Annotated, NotRequired, TypedDict
 from datetime import datetime
 
+from src.utils.batches import RecordBatch
+
 
 class DrugQuery(BaseModel):
     """Validates drug search queries"""
@@ -39,3 +42,46 @@ class ResearchPaper(BaseModel):
     authors: List[str]
     publication_date: Optional[datetime] = None
     abstract: Optional[str] = None
+
+
+# Bulk record types, validated a whole list at a time by the batches below
+
+class ClinicalTrialRecord(TypedDict):
+    trial_id: str
+    title: str
+    status: str
+    participants: Annotated[int, Field(ge=0)]
+    start_date: NotRequired[Optional[datetime]]
+
+
+class PatentRecord(TypedDict):
+    patent_id: str
+    title: str
+    filing_date: NotRequired[Optional[datetime]]
+    assignee: NotRequired[Optional[str]]
+
+
+class ResearchPaperRecord(TypedDict):
+    pubmed_id: str
+    title: str
+    authors: List[str]
+    publication_date: NotRequired[Optional[datetime]]
+    abstract: NotRequired[Optional[str]]
+
+
+class ClinicalTrialBatch(RecordBatch):
+    """Column-wise batch of clinical trials"""
+    record_type = ClinicalTrialRecord
+    dtypes = {"participants": "int64", "start_date": "datetime64[us]"}
+
+
+class PatentBatch(RecordBatch):
+    """Column-wise batch of patents"""
+    record_type = PatentRecord
+    dtypes = {"filing_date": "datetime64[us]"}
+
+
+class ResearchPaperBatch(RecordBatch):
+    """Column-wise batch of research papers"""
+    record_type = ResearchPaperRecord
+    dtypes = {"publication_date": "datetime64[us]"}
@@ -0,0 +1,136 @@
+"""Tests for column-wise record batches."""
+
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from src.agents.patent_agent import PatentAgent
+from src.models import DrugBatch, TrialBatch
+from src.utils.batches import parse_partial_date
+from src.utils.validators import ClinicalTrialBatch, PatentBatch, ResearchPaperBatch
+
+
+def trial(trial_id, participants=10, start_date=None, status="RECRUITING"):
+    return {
+        "trial_id": trial_id,
+        "title": f"Trial {trial_id}",
+        "status": status,
+        "participants": participants,
+        "start_date": start_date,
+    }
+
+
+@pytest.fixture
+def trials():
+    return ClinicalTrialBatch.validate([
+        trial("NCT1", 10, datetime(2020, 1, 1)),
+        trial("NCT2", 20, datetime(2021, 6, 1, tzinfo=timezone.utc)),
+        trial("NCT3", 30),
+    ])
+
+
+def test_validate_builds_typed_columns(trials):
+    assert len(trials) == 3
+    assert trials.to_numpy("participants").dtype == np.int64
+    assert trials.to_numpy("start_date").dtype == np.dtype("datetime64[us]")
+    assert trials[1]["start_date"] == datetime(2021, 6, 1)
+    assert trials[2]["start_date"] is None
+    assert [record["trial_id"] for record in trials] == ["NCT1", "NCT2", "NCT3"]
+
+
+@pytest.mark.parametrize("record", [
+    trial("NCT1", participants=-1),
+    trial("NCT1", participants="many"),
+    {"trial_id": "NCT1", "title": "No status", "participants": 1},
+])
+def test_bad_record_raises(record):
+    with pytest.raises(ValidationError):
+        ClinicalTrialBatch.validate([trial("NCT0"), record])
+
+
+def test_to_pandas_shares_numpy_columns(trials):
+    frame = trials.to_pandas()
+    assert np.shares_memory(frame["participants"].to_numpy(), trials.to_numpy("participants"))
+    assert np.shares_memory(frame["start_date"].to_numpy(), trials.to_numpy("start_date"))
+    assert list(frame["trial_id"]) == ["NCT1", "NCT2", "NCT3"]
+
+
+def test_empty_batch():
+    batch = ClinicalTrialBatch.empty()
+    assert len(batch) == 0 and batch.to_records() == []
+    frame = batch.to_pandas()
+    assert list(frame.columns) == ClinicalTrialBatch.fields()
+    assert frame["trial_id"].dtype == object
+    assert frame["participants"].dtype == np.int64
+    assert frame["trial_id"].dtype == ClinicalTrialBatch.validate([trial("NCT1")]).to_pandas()["trial_id"].dtype
+
+
+def test_head(trials):
+    assert [record["trial_id"] for record in trials.head(2)] == ["NCT1", "NCT2"]
+    assert len(trials.head(10)) == 3
+    assert len(trials.head(-1)) == 0
+
+
+def test_merge_replaces_records_by_key(trials):
+    update = ClinicalTrialBatch.validate([trial("NCT2", 25, status="COMPLETED"), trial("NCT4")])
+    merged = trials.merge(update, key="trial_id")
+    assert list(merged.to_numpy("trial_id")) == ["NCT1", "NCT3", "NCT2", "NCT4"]
+    assert merged[2]["status"] == "COMPLETED" and merged[2]["participants"] == 25
+    assert merged.to_numpy("participants").dtype == np.int64
+
+
+def test_json_records_round_trip(trials):
+    records = trials.to_json_records()
+    assert records[0]["start_date"] == "2020-01-01T00:00:00"
+    assert ClinicalTrialBatch.validate(records).to_records() == trials.to_records()
+
+
+def test_other_batches():
+    papers = ResearchPaperBatch.validate([
+        {"pubmed_id": "1", "title": "A", "authors": ["X", "Y"], "publication_date": "2022-03-01"},
+    ])
+    assert papers[0]["authors"] == ["X", "Y"]
+    assert papers[0]["publication_date"] == datetime(2022, 3, 1)
+
+    drugs = DrugBatch.validate([
+        {"drug_id": "D1", "name": "aspirin", "formula": "C9H8O4", "molecular_weight": "180.16"},
+    ])
+    assert drugs.to_numpy("molecular_weight")[0] == pytest.approx(180.16)
+
+    phases = TrialBatch.validate([
+        {"trial_id": "T1", "drug_id": "D1", "phase": 3, "status": "active", "participants": 100},
+    ])
+    assert phases.to_numpy("phase").tolist() == [3]
+
+
+def test_parse_partial_date():
+    assert parse_partial_date("2023") == datetime(2023, 1, 1)
+    assert parse_partial_date("2023-05") == datetime(2023, 5, 1)
+    assert parse_partial_date("2023-05-17T10:00:00") == datetime(2023, 5, 17)
+    assert parse_partial_date("") is None and parse_partial_date("n/a") is None
+
+
+class Patents(PatentAgent):
+    def validate_input(self, input_data):
+        return True
+
+
+async def test_search_patents_batch(monkeypatch):
+    agent = Patents("key")
+
+    async def search_patents(query):
+        return [
+            {"patentNumber": "US1", "inventionTitle": "Tablet", "filingDate": "2015-04",
+             "assigneeEntityName": "Acme"},
+            {"patentNumber": "US2", "inventionTitle": "Coating"},
+        ]
+
+    monkeypatch.setattr(agent, "search_patents", search_patents)
+    patents = await agent.search_patents_batch("aspirin")
+    assert isinstance(patents, PatentBatch)
+    assert patents.to_records() == [
+        {"patent_id": "US1", "title": "Tablet", "filing_date": datetime(2015, 4, 1), "assignee": "Acme"},
+        {"patent_id": "US2", "title": "Coating", "filing_date": None, "assignee": None},
+    ]
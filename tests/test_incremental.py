@@ -0,0 +1,136 @@
+"""Tests for conditional fetching, shared snapshots and trial pagination."""
+
+from datetime import datetime
+
+import httpx
+import pytest
+
+from src.agents import clinical_trials_agent
+from src.agents.clinical_trials_agent import ClinicalTrialsAgent
+from src.utils.incremental import ConditionalFetcher, load_snapshot, save_snapshot
+from src.utils.state_store import InMemoryStateStore
+
+
+class TrialsAgent(ClinicalTrialsAgent):
+    def validate_input(self, input_data):
+        return True
+
+
+def study(nct_id):
+    return {"protocolSection": {"identificationModule": {"nctId": nct_id}}}
+
+
+async def test_fetcher_reuses_body_on_304():
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json={"n": 1}, headers={"ETag": '"v1"'})
+
+    fetcher = ConditionalFetcher()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        assert await fetcher.get_json(client, "https://x/a", {"q": 1}) == ({"n": 1}, True)
+        assert await fetcher.get_json(client, "https://x/a", {"q": 1}) == ({"n": 1}, False)
+    assert seen == [None, '"v1"']
+
+
+async def test_fetcher_skips_cache_for_one_off_urls():
+    store = InMemoryStateStore()
+
+    def handler(request):
+        return httpx.Response(200, json={}, headers={"ETag": '"v1"'})
+
+    fetcher = ConditionalFetcher(store)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        await fetcher.get_json(client, "https://x/a", conditional=False)
+    assert len(store._cache) == 0
+
+
+async def test_memory_cache_is_bounded():
+    store = InMemoryStateStore(max_cache_entries=2)
+    await store.cache_set("a", {}, 60)
+    await store.cache_set("b", {}, 60)
+    await store.cache_get("a")
+    await store.cache_set("c", {}, 60)
+    assert await store.cache_get("b") is None
+    assert await store.cache_get("a") == {}
+
+
+async def test_snapshot_round_trip():
+    store = InMemoryStateStore()
+    synced = datetime(2024, 5, 1, 12, 30)
+    await save_snapshot(store, "k", ["1", "2"], synced)
+    snapshot = await load_snapshot(store, "k")
+    assert snapshot.data == ["1", "2"] and snapshot.synced_at == synced
+    assert await load_snapshot(store, "missing") is None
+
+
+@pytest.fixture
+def trials_api(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.params)
+        if "filter.advanced" in request.url.params:
+            return httpx.Response(200, json={"studies": [study("NCT2"), study("NCT4")]})
+        if request.url.params.get("pageToken") == "p2":
+            return httpx.Response(200, json={"studies": [study("NCT3")]})
+        return httpx.Response(200, json={"studies": [study("NCT1"), study("NCT2")], "nextPageToken": "p2"})
+
+    transport = httpx.MockTransport(handler)
+    client_class = httpx.AsyncClient
+    monkeypatch.setattr(
+        clinical_trials_agent.httpx, "AsyncClient", lambda: client_class(transport=transport)
+    )
+    return requests
+
+
+async def test_first_page_only_by_default(trials_api):
+    studies = await TrialsAgent("key").search_trials("aspirin", "pain")
+    assert len(studies) == 2 and len(trials_api) == 1
+
+
+async def test_refresh_follows_pages_and_shares_snapshots(trials_api):
+    store = InMemoryStateStore()
+    first = await TrialsAgent("key", store=store).refresh_trials("Aspirin", "pain")
+    assert list(first.to_numpy("trial_id")) == ["NCT1", "NCT2", "NCT3"]
+    assert trials_api[0]["pageSize"] == "1000"
+
+    # Another worker sharing the store only asks for the delta.
+    second = await TrialsAgent("key", store=store).refresh_trials("aspirin", "pain")
+    assert "filter.advanced" in trials_api[-1]
+    assert list(second.to_numpy("trial_id")) == ["NCT1", "NCT3", "NCT2", "NCT4"]
+
+
+async def test_delta_overlaps_previous_sync(trials_api):
+    store = InMemoryStateStore()
+    # Synced just after midnight UTC, still the previous day in US Eastern time.
+    await save_snapshot(store, "trials:aspirin|pain", [], datetime(2024, 5, 10, 1, 0))
+    await TrialsAgent("key", store=store).refresh_trials("aspirin", "pain")
+    assert trials_api[-1]["filter.advanced"] == "AREA[LastUpdatePostDate]RANGE[2024-05-08,MAX]"
+    assert trials_api[-1]["fields"] == ClinicalTrialsAgent.record_fields
+
+
+async def test_pmid_delta_overlaps_previous_sync(monkeypatch):
+    pytest.importorskip("langchain")
+    from src.agents.pubmed_agent import PubMedAgent
+
+    class Agent(PubMedAgent):
+        def validate_input(self, input_data):
+            return True
+
+    store = InMemoryStateStore()
+    await save_snapshot(store, "pmids:rxcui:1191|pain", ["1", "2"], datetime(2024, 5, 10, 1, 0))
+    agent = Agent("key", store=store)
+    calls = []
+
+    async def search_pmids(query, since=None):
+        calls.append(since)
+        return ["3", "2"]
+
+    monkeypatch.setattr(agent, "search_pmids", search_pmids)
+    pmids = await agent.refresh_pmids("aspirin pain", molecule_id="rxcui:1191", indication="pain")
+    assert calls == [datetime(2024, 5, 8, 1, 0)]
+    assert pmids == ["3", "2", "1"]
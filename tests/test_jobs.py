@@ -0,0 +1,128 @@
+"""Tests for discovery job processing in the API workers."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from src import main
+from src.utils.state_store import InMemoryStateStore
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    monkeypatch.setattr(main, "state_store", InMemoryStateStore())
+    monkeypatch.setattr(main.settings, "orchestration_workers", 1)
+    monkeypatch.setattr(main.settings, "preempt_check_interval", 0.05)
+    await main.start_workers()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    await main.stop_workers()
+
+
+async def discover(client, **body):
+    response = await client.post("/api/v1/discover", json=body)
+    return response.json()["request_id"]
+
+
+async def status(client, request_id):
+    return (await client.get(f"/api/v1/status/{request_id}")).json()["status"]
+
+
+async def test_cancel_stops_running_job(client):
+    request_id = await discover(client, molecule_name="metformin")
+    await asyncio.sleep(0.2)
+    assert request_id in main.running_jobs
+    assert (await client.delete(f"/api/v1/discover/{request_id}")).json()["status"] == "cancelled"
+    await asyncio.sleep(0.1)
+    assert main.running_jobs == {}
+    assert await status(client, request_id) == "cancelled"
+
+
+async def test_interactive_job_takes_over_bulk_worker(client):
+    bulk = await discover(client, molecule_name="aspirin", priority="bulk")
+    await asyncio.sleep(0.2)
+    interactive = await discover(client, molecule_name="ibuprofen")
+
+    result = await client.get(f"/api/v1/results/{interactive}", params={"wait": 5})
+    assert result.json()["status"] == "completed"
+    assert await status(client, bulk) == "processing"
+
+    # The preempted job was requeued and runs once the worker is free.
+    result = await client.get(f"/api/v1/results/{bulk}", params={"wait": 5})
+    assert result.json()["status"] == "completed"
+
+
+async def test_failed_enqueue_marks_request_as_error(client, monkeypatch):
+    async def enqueue_job(*args):
+        raise ConnectionError("queue unavailable")
+
+    monkeypatch.setattr(main.state_store, "enqueue_job", enqueue_job)
+    response = await client.post("/api/v1/discover", json={"molecule_name": "aspirin"})
+    assert response.status_code == 400
+    # The processing state written just before is finished as an error
+    (request_id,) = main.state_store._data
+    assert await status(client, request_id) == "error"
+
+
+async def test_distinct_molecules_do_not_share_findings(client):
+    for name in ["α-tocopherol", "β-tocopherol", "ибупрофен", "阿司匹林"]:
+        request_id = await discover(client, molecule_name=name)
+        result = await client.get(f"/api/v1/results/{request_id}", params={"wait": 5})
+        assert result.json()["findings"]["summary"] == f"Analysis complete for {name}"
+
+
+async def test_blank_molecule_name_is_rejected(client):
+    response = await client.post("/api/v1/discover", json={"molecule_name": "  "})
+    assert response.status_code == 400
+
+
+async def test_stream_sends_state_at_once_and_cancels_on_disconnect(client):
+    request_id = await discover(client, molecule_name="metformin")
+    messages = []
+    received_request = False
+    got_event = asyncio.Event()
+
+    async def receive():
+        nonlocal received_request
+        if not received_request:
+            received_request = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await got_event.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if message["type"] == "http.response.body" and message.get("body"):
+            got_event.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": f"/api/v1/discover/{request_id}/stream",
+        "raw_path": f"/api/v1/discover/{request_id}/stream".encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    # The discovery takes seconds, so the first event can only be the current state
+    await asyncio.wait_for(main.app(scope, receive, send), 1)
+
+    bodies = [m["body"] for m in messages if m["type"] == "http.response.body" and m.get("body")]
+    assert b'"status": "processing"' in bodies[0]
+    assert await status(client, request_id) == "cancelled"
+
+
+async def test_filtered_requests_get_their_own_findings(client):
+    for filters in [None, {"clinical_stage": "Phase 3"}, {"clinical_stage": "Phase 3"}]:
+        request_id = await discover(client, molecule_name="aspirin", indication="pain", filters=filters)
+        await client.get(f"/api/v1/results/{request_id}", params={"wait": 5})
+    stats = (await client.get("/api/v1/cache/stats")).json()
+    assert (stats["cache_misses"], stats["cache_hits"]) == (2, 1)
+    assert [query["count"] for query in stats["top_queries"]] == [1]
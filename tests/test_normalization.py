@@ -0,0 +1,82 @@
+"""Tests for molecule name normalization."""
+
+import pytest
+
+from src.utils.normalization import SynonymIndex, fold, fold_key, load_synonym_index, query_key
+
+
+@pytest.fixture
+def index():
+    index = SynonymIndex(fuzzy=True)
+    index.add("rxcui:1191", "aspirin", ["acetylsalicylic acid", "ASA"])
+    index.add("rxcui:5640", "ibuprofen", [])
+    index.add("rxcui:6809", "metformin", ["metformin hydrochloride"])
+    return index
+
+
+def test_fold_ignores_case_accents_and_punctuation():
+    assert fold("  Acétylsalicylic-Acid ") == "acetylsalicylic acid"
+
+
+def test_fold_spells_out_greek_letters():
+    assert fold("α-tocopherol") == "alfa tocopherol"
+    assert fold("β-tocopherol") == "beta tocopherol"
+    assert fold("Interferon α-2b") == fold("interferon alfa-2b") == "interferon alfa 2b"
+
+
+def test_fold_keeps_letters_of_any_script():
+    assert fold("Ибупрофен") == "ибупрофен"
+    assert fold("阿司匹林") == "阿司匹林"
+    assert fold("ибупрофен") != fold("阿司匹林")
+
+
+def test_names_with_nothing_to_fold_keep_their_text():
+    assert fold("---") == ""
+    assert fold_key(" --- ") == "---"
+    index = SynonymIndex()
+    assert index.normalize("---").canonical_id == "---"
+    assert query_key("rxcui:1191", "---") == "rxcui:1191|---"
+    for blank in ["", "   "]:
+        with pytest.raises(ValueError):
+            index.normalize(blank)
+
+
+def test_distinct_molecules_get_distinct_ids():
+    index = SynonymIndex()
+    names = ["α-tocopherol", "β-tocopherol", "阿司匹林", "ибупрофен", "---", "***"]
+    assert len({index.normalize(name).canonical_id for name in names}) == len(names)
+
+
+def test_synonyms_share_a_canonical_id(index):
+    ids = {index.normalize(name).canonical_id for name in ["Aspirin ", "ASA", "acetylsalicylic acid"]}
+    assert ids == {"rxcui:1191"}
+    assert index.normalize("unknown-drug") == ("unknown drug", "unknown-drug")
+
+
+def test_fuzzy_lookup_matches_misspellings(index):
+    assert index.lookup("ibuprofin").canonical_id == "rxcui:5640"
+    assert index.lookup("metformin hydrochlorid").canonical_id == "rxcui:6809"
+    assert index.lookup("zolpidem") is None
+    # Results are remembered until the index changes.
+    index.add("rxcui:39993", "zolpidem", [])
+    assert index.lookup("zolpidem").canonical_id == "rxcui:39993"
+
+
+def test_fuzzy_lookup_is_off_by_default():
+    index = SynonymIndex()
+    index.add("rxcui:5640", "ibuprofen", [])
+    assert index.lookup("ibuprofin") is None
+
+
+def test_packaged_synonyms_load_by_default():
+    assert load_synonym_index().lookup("paracetamol").canonical_id == "rxcui:161"
+
+
+def test_configured_file_must_exist(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_synonym_index(tmp_path / "missing.tsv")
+
+
+def test_query_key_folds_indication():
+    assert query_key("rxcui:1191", "Heart  Failure") == "rxcui:1191|heart failure"
+    assert query_key("rxcui:1191") == "rxcui:1191"
@@ -0,0 +1,61 @@
+"""Tests for cache pre-warming."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from src.utils.prewarm import PrewarmScheduler
+from src.utils.state_store import InMemoryStateStore
+
+
+def window_now(minutes: int = 60) -> str:
+    """A window that started a minute ago."""
+    start = datetime.now() - timedelta(minutes=1)
+    end = start + timedelta(minutes=minutes)
+    return f"{start:%H:%M}-{end:%H:%M}"
+
+
+async def test_warms_queries_that_expire_before_next_window():
+    store = InMemoryStateStore()
+    for molecule_id, name in [("rxcui:1191", "aspirin"), ("rxcui:5640", "ibuprofen"),
+                              ("rxcui:161", "paracetamol")]:
+        info = {"molecule_id": molecule_id, "molecule_name": name, "indication": "Pain"}
+        await store.record_query(f"{molecule_id}|pain", info)
+    # Fresh for another two days, expiring before tomorrow's window, uncached.
+    await store.cache_set("rxcui:1191|pain", {"findings": {}}, 2 * 86400)
+    await store.cache_set("rxcui:5640|pain", {"findings": {}}, 3600)
+
+    warmed = []
+
+    async def warm(molecule_id, molecule_name, indication):
+        warmed.append(molecule_name)
+        return {"findings": {}}
+
+    scheduler = PrewarmScheduler(
+        store, warm, window_now(), top_n=10, rate_per_minute=6000, cache_ttl=86400, owner="w1"
+    )
+    assert await scheduler.warm_top_queries() == 2
+    assert sorted(warmed) == ["ibuprofen", "paracetamol"]
+    assert (await store.cache_get("rxcui:161|pain"))["prewarmed"] is True
+    assert await store.cache_ttl("rxcui:5640|pain") > 86000
+
+
+async def test_run_warms_once_per_window_and_decays_history():
+    store = InMemoryStateStore()
+    info = {"molecule_id": "rxcui:1191", "molecule_name": "aspirin", "indication": None}
+    for _ in range(4):
+        await store.record_query("rxcui:1191", info)
+    runs = []
+
+    async def warm(molecule_id, molecule_name, indication):
+        runs.append(molecule_id)
+        return {"findings": {}}
+
+    scheduler = PrewarmScheduler(
+        store, warm, window_now(), top_n=10, rate_per_minute=6000, cache_ttl=86400,
+        owner="w1", check_interval=0
+    )
+    task = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(0.1)
+    task.cancel()
+    assert runs == ["rxcui:1191"]
+    assert await store.top_queries(1) == [("rxcui:1191", 2, info)]
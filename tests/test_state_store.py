@@ -0,0 +1,214 @@
+"""Tests for the shared request state backends."""
+
+import asyncio
+import json
+
+import pytest
+
+from src.utils.state_store import InMemoryStateStore, RedisStateStore
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture(params=["memory", "redis"])
+async def store(request):
+    if request.param == "memory":
+        store = InMemoryStateStore()
+    else:
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        store = RedisStateStore(client=client)
+        store.claim_poll_interval = 0.01
+    yield store
+    await store.close()
+
+
+async def test_get_set_update(store):
+    assert await store.get("req_1") is None
+    await store.set("req_1", {"status": "processing"})
+    await store.update("req_1", {"molecule_id": "rxcui:1191"})
+    assert await store.get("req_1") == {"status": "processing", "molecule_id": "rxcui:1191"}
+
+
+async def test_claim_serves_interactive_first_and_fifo(store):
+    await store.enqueue_job("bulk_1", {"n": 1}, "bulk")
+    await store.enqueue_job("int_1", {"n": 2}, "interactive")
+    await store.enqueue_job("int_2", {"n": 3}, "interactive")
+
+    claimed = [await store.claim_job("w1", 30, timeout=0) for _ in range(3)]
+    assert [job[0] for job in claimed] == ["int_1", "int_2", "bulk_1"]
+    assert claimed[0][1] == {"n": 2}
+    assert await store.claim_job("w1", 30, timeout=0) is None
+
+
+async def test_claim_waits_for_enqueue(store):
+    claim = asyncio.create_task(store.claim_job("w1", 30, timeout=2))
+    await asyncio.sleep(0.05)
+    await store.enqueue_job("req_1", {})
+    assert (await claim)[0] == "req_1"
+
+
+async def test_claim_can_be_limited_to_priorities(store):
+    await store.enqueue_job("bulk_1", {}, "bulk")
+    assert await store.claim_job("w1", 30, timeout=0, priorities=("interactive",)) is None
+    assert (await store.claim_job("w1", 30, timeout=0))[0] == "bulk_1"
+
+
+async def test_expired_lease_is_requeued(store):
+    await store.set("req_1", {"status": "processing"})
+    await store.enqueue_job("req_1", {"n": 1})
+    assert await store.claim_job("w1", 1, timeout=0)
+    assert await store.expired_jobs() == []
+
+    await asyncio.sleep(1.1)
+    assert await store.expired_jobs() == ["req_1"]
+    assert await store.requeue("req_1")
+    assert await store.claim_job("w2", 30, timeout=0) == ("req_1", {"n": 1})
+
+
+async def test_lost_lease_cannot_be_renewed_or_released(store):
+    await store.enqueue_job("req_1", {})
+    await store.claim_job("w1", 1, timeout=0)
+    assert await store.renew_lease("req_1", "w1", 1)
+
+    await asyncio.sleep(1.1)
+    await store.expired_jobs()
+    await store.requeue("req_1")
+    assert await store.claim_job("w2", 30, timeout=0)
+
+    assert not await store.renew_lease("req_1", "w1", 30)
+    assert not await store.release_lease("req_1", "w1", requeue=True)
+    # w2 still owns the job and nothing was queued twice
+    assert await store.renew_lease("req_1", "w2", 30)
+    assert await store.claim_job("w3", 30, timeout=0) is None
+
+
+async def test_release_with_requeue_goes_to_front(store):
+    await store.enqueue_job("bulk_1", {}, "bulk")
+    await store.enqueue_job("bulk_2", {}, "bulk")
+    await store.claim_job("w1", 30, timeout=0)
+
+    assert await store.release_lease("bulk_1", "w1", requeue=True)
+    assert (await store.claim_job("w1", 30, timeout=0))[0] == "bulk_1"
+    assert await store.expired_jobs() == []
+
+
+async def test_release_without_requeue_forgets_job(store):
+    await store.enqueue_job("req_1", {})
+    await store.claim_job("w1", 30, timeout=0)
+    assert await store.release_lease("req_1", "w1")
+    assert not await store.requeue("req_1")
+    assert await store.expired_jobs() == []
+
+
+async def test_wait_for_completion(store):
+    await store.set("req_1", {"status": "processing"})
+    waiter = asyncio.create_task(store.wait_for_completion("req_1", 5))
+    await asyncio.sleep(0.05)
+    await store.update("req_1", {"status": "completed"})
+    await store.publish_completion("req_1")
+    assert (await waiter)["status"] == "completed"
+
+
+async def test_finish_only_applies_to_processing_requests(store):
+    await store.set("req_1", {"status": "processing", "molecule_id": "rxcui:1191"})
+    waiter = asyncio.create_task(store.wait_for_completion("req_1", 5))
+    await asyncio.sleep(0.05)
+    assert await store.finish("req_1", {"status": "cancelled"})
+    assert (await waiter)["status"] == "cancelled"
+
+    # A completion racing the cancellation loses and leaves it untouched.
+    assert not await store.finish("req_1", {"status": "completed", "findings": []})
+    assert await store.get("req_1") == {"status": "cancelled", "molecule_id": "rxcui:1191"}
+    assert not await store.finish("missing", {"status": "completed"})
+
+
+async def test_redis_finish_retries_when_state_changes():
+    store = RedisStateStore(client=fakeredis.aioredis.FakeRedis(decode_responses=True))
+    await store.set("req_1", {"status": "processing"})
+    script = store._finish
+
+    async def concurrent_update(keys, args):
+        # Another writer lands between the read and the compare-and-set.
+        if json.loads(args[0]) == {"status": "processing"}:
+            await store.update("req_1", {"progress": 1})
+        return await script(keys=keys, args=args)
+
+    store._finish = concurrent_update
+    assert await store.finish("req_1", {"status": "completed", "findings": []})
+    assert await store.get("req_1") == {"status": "completed", "progress": 1, "findings": []}
+    await store.close()
+
+
+async def test_wait_for_completion_times_out(store):
+    await store.set("req_1", {"status": "processing"})
+    result = await store.wait_for_completion("req_1", 0.1)
+    assert result["status"] == "processing"
+    assert await store.wait_for_completion("missing", 0.1) is None
+
+
+async def test_memory_store_evicts_finished_and_expired_requests():
+    store = InMemoryStateStore(request_ttl=1)
+    await store.set("req_1", {"status": "processing"})
+    await store.enqueue_job("req_1", {})
+    await store.wait_for_completion("req_1", 0.01)
+    await store.claim_job("w1", 30, timeout=0)
+    await store.publish_completion("req_1")
+    await store.release_lease("req_1", "w1")
+    assert store._events == {} and store._jobs == {}
+
+    await asyncio.sleep(1.1)
+    assert await store.get("req_1") is None
+    await store.expired_jobs()
+    assert store._data == {}
+
+
+async def test_cache_ttl(store):
+    assert await store.cache_ttl("k") is None
+    await store.cache_set("k", {"v": 1}, 60)
+    assert 59 < await store.cache_ttl("k") <= 60
+
+
+async def test_query_history_counts_keys_and_keeps_latest_info(store):
+    await store.record_query("rxcui:1191|pain", {"molecule_name": "Aspirin"})
+    await store.record_query("rxcui:5640|pain", {"molecule_name": "ibuprofen"})
+    await store.record_query("rxcui:1191|pain", {"molecule_name": "aspirin"})
+    assert await store.top_queries(1) == [("rxcui:1191|pain", 2, {"molecule_name": "aspirin"})]
+    assert len(await store.top_queries(5)) == 2
+
+
+async def test_query_history_is_bounded(store):
+    store.max_queries = 2
+    for key in ["a", "a", "a", "b", "b", "c"]:
+        await store.record_query(key, {"name": key})
+    # "c" replaced the least requested "b" and took over its count.
+    assert sorted(await store.top_queries(5)) == [("a", 3, {"name": "a"}), ("c", 3, {"name": "c"})]
+
+
+async def test_query_history_decays(store):
+    for key in ["a", "a", "a", "a"]:
+        await store.record_query(key, {})
+    await store.decay_queries(0.5)
+    for key in ["b", "b", "b"]:
+        await store.record_query(key, {})
+    assert [(key, count) for key, count, _ in await store.top_queries(2)] == [("b", 3), ("a", 2)]
+
+
+async def test_lock_excludes_other_owners_until_it_expires(store):
+    assert await store.acquire_lock("prewarm", "w1", 1)
+    assert not await store.acquire_lock("prewarm", "w2", 1)
+    assert await store.expired_jobs() == []
+    await asyncio.sleep(1.1)
+    assert await store.acquire_lock("prewarm", "w2", 1)
+
+
+async def test_redis_keys_share_one_cluster_slot():
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    store = RedisStateStore(client=client)
+    await store.set("req_1", {"status": "processing"})
+    await store.enqueue_job("req_1", {})
+    await store.enqueue_job("req_2", {}, "bulk")
+    await store.claim_job("w1", 30, timeout=0)
+    await store.release_lease("req_1", "w1", requeue=True)
+    await store.cache_set("k", {}, 60)
+    assert all(key.startswith("{pharma}:") for key in await client.keys("*"))
+    await store.close()